@@ -0,0 +1,262 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    key INTEGER PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    flag INTEGER NOT NULL,
+    move INTEGER,
+    used INTEGER NOT NULL
+)
+"""
+
+UPSERT = """
+INSERT INTO positions (key, depth, score, flag, move, used) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    depth = excluded.depth, score = excluded.score, flag = excluded.flag,
+    move = excluded.move, used = excluded.used
+WHERE excluded.depth >= positions.depth
+"""
+
+TOUCH = "UPDATE positions SET used = ? WHERE key = ?"
+
+
+def position_key(spec, own, opp, variant=""):
+    """
+    Stable 64-bit hash of a position, usable across processes and runs
+
+    The spec fingerprint is part of the hash, so different board variants can
+    share one cache file. The variant names anything else the stored result
+    depends on, such as the evaluation function.
+    """
+    size = (spec.n_cells + 7) // 8
+    data = (spec.fingerprint.encode() + variant.encode() +
+            own.to_bytes(size, "little") + opp.to_bytes(size, "little"))
+    digest = hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class EvalCache:
+    def __init__(self, path, max_entries=1000000, readonly=False, batch_size=512,
+                 flush_interval=1.0):
+        """
+        Persistent position cache backed by a SQLite file
+
+        Entries map a position hash to (depth, score, flag, best move). The
+        file is opened lazily on first use, separately in every process, so
+        a cache object can be handed to worker processes. Writes, and the
+        use stamps of hits, are queued and committed in batches by a
+        background thread; when the file holds more than max_entries
+        positions the least recently used ones are evicted.
+
+        Args:
+            path: SQLite file to use
+            max_entries: Size cap of the file
+            readonly: Open the file read-only; writes are ignored. Use this
+                      to share one file across many worker processes.
+            batch_size: Number of queued writes committed together
+            flush_interval: Seconds between commits when writes trickle in
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.readonly = readonly
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._pid = None
+        self._local = None
+        self._queue = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Connections and threads are per process: only ship the settings
+        state = self.__dict__.copy()
+        for name in ("_pid", "_local", "_queue", "_writer", "_lock"):
+            state[name] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        if self.readonly:
+            uri = f"file:{os.path.abspath(self.path)}?mode=ro"
+            return sqlite3.connect(uri, uri=True, check_same_thread=False)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(SCHEMA)
+        connection.commit()
+        return connection
+
+    def _ensure_open(self):
+        """Open the file and start the writer on first use in this process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._local = threading.local()
+            if not self.readonly:
+                self._queue = queue.Queue()
+                self._writer = threading.Thread(target=self._write_loop, daemon=True,
+                                                name="EvalCacheWriter")
+                # Create the file and table before any reader touches it
+                self._connect().close()
+                self._writer.start()
+            self._pid = os.getpid()
+
+    def _reader(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def get(self, spec, own, opp, variant=""):
+        """
+        Look up a position (variant as in position_key)
+
+        Returns:
+            (depth, score, flag, move) or None
+        """
+        self._ensure_open()
+        key = position_key(spec, own, opp, variant)
+        try:
+            row = self._reader().execute(
+                "SELECT depth, score, flag, move FROM positions WHERE key = ?",
+                (key,)).fetchone()
+        except sqlite3.OperationalError:
+            row = None  # Read-only file that does not exist yet
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if not self.readonly:
+            # Refresh the use stamp so entries that are read keep their place
+            self._queue.put((key, None))
+        return row
+
+    def put(self, spec, own, opp, entry, variant=""):
+        """Queue a (depth, score, flag, move) entry for writing"""
+        if self.readonly:
+            return
+        self._ensure_open()
+        self._queue.put((position_key(spec, own, opp, variant), entry))
+
+    def flush(self):
+        """Block until every queued write is committed"""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Commit pending writes and release the file"""
+        if self._pid != os.getpid():
+            return
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+        self._pid = None
+        self._writer = None
+        self._queue = None
+
+    def __len__(self):
+        self._ensure_open()
+        try:
+            return self._reader().execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+
+    def _write_loop(self):
+        connection = self._connect()
+        used = connection.execute("SELECT COALESCE(MAX(used), 0) FROM positions").fetchone()[0]
+        count = connection.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        stop = False
+
+        while not stop:
+            # Gather a batch: wait for the first item, then take what is queued
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            while True:
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                rows = []
+                touches = []
+                for key, entry in batch:
+                    used += 1
+                    if entry is None:
+                        touches.append((used, key))
+                    else:
+                        rows.append((key, *entry, used))
+                with connection:
+                    connection.executemany(UPSERT, rows)
+                    connection.executemany(TOUCH, touches)
+                count += len(rows)
+                if count > self.max_entries:
+                    count = self._evict(connection)
+
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+        connection.close()
+
+    def _evict(self, connection):
+        """Drop the least recently used entries down to 90% of the cap"""
+        count = connection.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        excess = count - int(self.max_entries * 0.9)
+        if excess > 0 and count > self.max_entries:
+            with connection:
+                connection.execute(
+                    "DELETE FROM positions WHERE key IN "
+                    "(SELECT key FROM positions ORDER BY used LIMIT ?)", (excess,))
+            count -= excess
+        return count
+
+
+# Show a cold and a warm search if run as a script
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from search import Searcher
+
+    path = os.path.join(tempfile.mkdtemp(), "eval_cache.sqlite")
+    for run in ("cold", "warm"):
+        with EvalCache(path) as cache:
+            searcher = Searcher(cache=cache)
+            own, opp = searcher.position({9, 16, 25}, {4, 10, 21})
+            start = time.perf_counter()
+            result = searcher.search(own, opp, depth=5)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{run}: move {result.move}, {result.nodes} nodes, {elapsed:.1f} ms, "
+                  f"cache hits {cache.hits}")
+    with EvalCache(path, readonly=True) as cache:
+        print(f"Cache file holds {len(cache)} positions")
@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+
+from search import Searcher, SearchAborted, WIN_SCORE, MATE_SCORE
+
+
+class MoveScore:
+    def __init__(self, move, selector, score, depth, pv, upper_bound=False):
+        """
+        Score of one candidate move
+
+        Args:
+            move: Board value to mark
+            selector: A selector that produces the move
+            score: Score after the move, for the side to move
+            depth: Depth in plies the move was searched to, counting the move
+            pv: Principal variation starting with the move
+            upper_bound: The score is only an upper bound (the move is
+                         outside the requested number of lines)
+        """
+        self.move = move
+        self.selector = selector
+        self.score = score
+        self.depth = depth
+        self.pv = pv
+        self.upper_bound = upper_bound
+
+    @property
+    def forced(self):
+        """The score is a proven win or loss"""
+        return abs(self.score) >= MATE_SCORE and not self.upper_bound
+
+    def __repr__(self):
+        bound = "<=" if self.upper_bound else ""
+        return f"MoveScore(move={self.move}, score={bound}{self.score}, pv={self.pv})"
+
+
+class AnalysisUpdate:
+    def __init__(self, moves, depth, nodes, elapsed, complete):
+        """
+        One step of a progressive analysis
+
+        Args:
+            moves: MoveScores, best first
+            depth: Deepest iteration reflected in the moves
+            nodes: Positions visited so far
+            elapsed: Seconds since the analysis started
+            complete: Every move was searched to depth; False for the last,
+                      partial update of an interrupted iteration
+        """
+        self.moves = moves
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.complete = complete
+
+    @property
+    def best(self):
+        return self.moves[0] if self.moves else None
+
+    def __repr__(self):
+        return (f"AnalysisUpdate(depth={self.depth}, best={self.best}, "
+                f"nodes={self.nodes}, complete={self.complete})")
+
+
+class Analyzer:
+    def __init__(self, searcher=None, spec=None):
+        """
+        Multi-PV analysis: score every legal move, refining as depth grows
+
+        Each iteration searches every root move with the Searcher's
+        negamax, reusing its transposition table, so later iterations are
+        cheap and a first answer is available after a few milliseconds.
+
+        Args:
+            searcher: Searcher to use (one is created if omitted); it must not
+                      run other searches while an analysis is in progress
+            spec: BoardSpec of the game, when no searcher is given
+        """
+        self.searcher = searcher or Searcher(spec)
+        self.spec = self.searcher.spec
+
+    def analyse(self, own, opp, max_depth=8, time_limit=None, node_limit=None,
+                lines=None, cancel=None):
+        """
+        Analyse a position, yielding an AnalysisUpdate after every iteration
+
+        Stopping early is always safe: close the generator between updates,
+        or set the cancel event to interrupt a running iteration. When the
+        budget runs out mid-iteration, a last update marked incomplete
+        combines the moves already re-searched with the previous iteration.
+
+        Args:
+            own: Mask of the side to move
+            opp: Mask of the opponent
+            max_depth: Deepest iteration, in plies
+            time_limit: Optional time budget in seconds
+            node_limit: Optional node budget
+            lines: Number of moves to score exactly (default all); the other
+                   moves only get upper bounds, which is cheaper
+            cancel: Optional threading.Event that stops the analysis
+
+        Yields:
+            AnalysisUpdate
+        """
+        searcher = self.searcher
+        spec = self.spec
+        start = time.perf_counter()
+        if len(searcher.table) > searcher.max_table_entries:
+            searcher.table.clear()
+        searcher.nodes = 0
+
+        moves = searcher.legal_moves(own, opp)
+        if not moves:
+            return
+        lines = len(moves) if lines is None else max(1, min(lines, len(moves)))
+        scores = {}
+
+        searcher._deadline = start + time_limit if time_limit is not None else None
+        searcher._node_limit = node_limit
+        searcher._cancel = cancel
+        try:
+            for depth in range(1, max_depth + 1):
+                current = {}
+                try:
+                    for k in moves:
+                        current[k] = self._score_move(own, opp, k, depth, current, lines)
+                except SearchAborted:
+                    if current:
+                        scores.update(current)
+                        yield self._update(scores, depth, start, complete=False)
+                    return
+
+                scores = current
+                update = self._update(scores, depth, start, complete=True)
+                yield update
+                if all(m.forced or m.upper_bound and m.score <= -MATE_SCORE
+                       for m in update.moves):
+                    return  # Every result is proven, deeper search cannot change them
+                # Next iteration searches the best moves first
+                moves = [spec.value_index[m.move] for m in update.moves]
+        finally:
+            searcher._deadline = None
+            searcher._node_limit = None
+            searcher._cancel = None
+
+    def analyse_marks(self, own_values, opp_values, **options):
+        """analyse() for sets of board values"""
+        own, opp = self.searcher.position(own_values, opp_values)
+        return self.analyse(own, opp, **options)
+
+    async def analyse_async(self, own, opp, **options):
+        """
+        Async iterator over the same updates, searching in a worker thread
+
+        Leaving the loop early cancels the search.
+        """
+        loop = asyncio.get_running_loop()
+        cancel = options.pop("cancel", None) or threading.Event()
+        updates = self.analyse(own, opp, cancel=cancel, **options)
+        try:
+            while True:
+                update = await loop.run_in_executor(None, next, updates, None)
+                if update is None:
+                    return
+                yield update
+        finally:
+            cancel.set()
+
+    def _score_move(self, own, opp, k, depth, current, lines):
+        """Search one root move at depth plies"""
+        searcher = self.searcher
+        spec = self.spec
+        value = spec.values[k]
+        selector = searcher.selector_for(value)
+        after = own | 1 << k
+        if spec.completes_win(after, k):
+            return MoveScore(value, selector, WIN_SCORE, depth, [value])
+
+        # Moves outside the best `lines` only need to be shown worse than the last of them
+        alpha = -WIN_SCORE - 1
+        exact = sorted((m.score for m in current.values() if not m.upper_bound), reverse=True)
+        if len(exact) >= lines:
+            alpha = exact[lines - 1]
+        score = -searcher._negamax(opp, after, depth - 1, -WIN_SCORE - 1, -alpha, 1)
+        pv = [value] + searcher.principal_variation(opp, after, depth - 1)
+        return MoveScore(value, selector, score, depth, pv, upper_bound=score <= alpha)
+
+    def _update(self, scores, depth, start, complete):
+        ranked = sorted(scores.values(), key=lambda m: (m.upper_bound, -m.score))
+        return AnalysisUpdate(ranked, depth, self.searcher.nodes,
+                              time.perf_counter() - start, complete)
+
+
+# Stream an analysis of a sample position if run as a script
+if __name__ == "__main__":
+    analyzer = Analyzer()
+    for update in analyzer.analyse_marks({9, 16, 25}, {4, 10, 21}, max_depth=6,
+                                         time_limit=2.0, lines=3):
+        top = ", ".join(f"{m.move} (x{m.selector}) {m.score}" for m in update.moves[:3])
+        print(f"Depth {update.depth}{'' if update.complete else ' (partial)'}: {top} "
+              f"| {update.nodes} nodes, {update.elapsed * 1000:.1f} ms")
+    print(f"Best line: {update.best.pv}")
+
+    async def first_answer():
+        own, opp = analyzer.searcher.position({9, 16, 25}, {4, 10, 21})
+        async for update in analyzer.analyse_async(own, opp):
+            return update
+
+    print(f"First async answer: {asyncio.run(first_answer())}")
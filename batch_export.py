@@ -0,0 +1,185 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from drawboard import BoardRenderer
+
+FORMATS = ("png", "svg")
+
+# Per-worker template figure, built once by _init_worker
+_template = None
+
+
+class BoardTemplate:
+    def __init__(self, renderer=None):
+        """
+        A game board figure that is drawn once and recoloured for each state
+
+        Only the cell colours change between states, so the table layout and
+        the tight bounding box are computed a single time.
+
+        Args:
+            renderer: Optional BoardRenderer providing the board and colours
+        """
+        self.renderer = renderer or BoardRenderer()
+        self.renderer.update_markers([], [])
+        self.fig, self.ax = self.renderer.draw_game_board()
+        self.table = self.ax.tables[0]
+        self.rows = len(self.renderer.board_numbers)
+        self.cols = len(self.renderer.board_numbers[0])
+
+        # Same bounding box savefig(bbox_inches='tight') would find
+        self.fig.canvas.draw()
+        renderer_ = self.fig.canvas.get_renderer()
+        self.bbox = self.fig.get_tightbbox(renderer_).padded(0.1)
+        # Layout is fixed from here on, so savefig needs no extra layout pass
+        self.fig.set_layout_engine('none')
+
+    def render(self, player_marks, computer_marks, highlight_cells, filename, fmt="png", dpi=300):
+        """Recolour the template for one state and save it"""
+        self.renderer.update_markers(player_marks, computer_marks)
+        for i in range(self.rows):
+            for j in range(self.cols):
+                self.table[(i, j)].set_facecolor(
+                    self.renderer.cell_face_color(i, j, highlight_cells))
+        self.fig.savefig(filename, format=fmt, dpi=dpi, bbox_inches=self.bbox,
+                         facecolor=self.fig.get_facecolor())
+        return filename
+
+    def close(self):
+        plt.close(self.fig)
+
+
+def state_key(player_marks, computer_marks, highlight_cells, fmt, dpi):
+    """Hash a board state and output settings into a stable cache key"""
+    text = "{}|{}|{}|{}|{}".format(
+        ",".join(str(v) for v in sorted(player_marks)),
+        ",".join(str(v) for v in sorted(computer_marks)),
+        ",".join(f"{r}:{c}" for r, c in sorted(highlight_cells or [])),
+        fmt, dpi)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _init_worker():
+    global _template
+    _template = BoardTemplate()
+
+
+def _render_batch(jobs):
+    """Render a list of (state, filename, fmt, dpi) jobs with the worker's template"""
+    global _template
+    if _template is None:
+        _init_worker()
+    for (player_marks, computer_marks, highlight_cells), filename, fmt, dpi in jobs:
+        _template.render(player_marks, computer_marks, highlight_cells, filename, fmt, dpi)
+    return len(jobs)
+
+
+class ExportReport:
+    def __init__(self, files, rendered, cached, elapsed):
+        """
+        Result of a batch export
+
+        Args:
+            files: Output filename for each requested state, in order
+            rendered: Number of images actually rendered
+            cached: Number of states served from the cache
+            elapsed: Wall-clock time in seconds
+        """
+        self.files = files
+        self.rendered = rendered
+        self.cached = cached
+        self.elapsed = elapsed
+
+    @property
+    def images_per_second(self):
+        """Requested images delivered per second, cache hits included"""
+        return len(self.files) / self.elapsed if self.elapsed > 0 else float("inf")
+
+    @property
+    def renders_per_second(self):
+        """Images actually rendered per second"""
+        return self.rendered / self.elapsed if self.elapsed > 0 else float("inf")
+
+    def __str__(self):
+        return (f"{len(self.files)} images ({self.rendered} rendered, {self.cached} cached) "
+                f"in {self.elapsed:.2f}s: {self.images_per_second:.1f} images/s, "
+                f"{self.renders_per_second:.1f} renders/s")
+
+
+def export_board_images(states, out_dir, fmt="png", dpi=300, workers=None, batch_size=32):
+    """
+    Render many board states to image files
+
+    Identical states are rendered once: files are named by the hash of the
+    state and output settings, so states already on disk are skipped too.
+
+    Args:
+        states: Iterable of (player_marks, computer_marks, highlight_cells)
+        out_dir: Directory for the images
+        fmt: "png" or "svg"
+        dpi: Output resolution
+        workers: Number of worker processes (None uses the CPU count,
+                 0 or 1 renders in this process)
+        batch_size: States sent to a worker at a time
+
+    Returns:
+        ExportReport with the output filename of every state
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(FORMATS)}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    files = []
+    pending = {}
+    for player_marks, computer_marks, highlight_cells in states:
+        key = state_key(player_marks, computer_marks, highlight_cells, fmt, dpi)
+        filename = os.path.join(out_dir, f"{key}.{fmt}")
+        files.append(filename)
+        if filename not in pending and not os.path.exists(filename):
+            pending[filename] = (player_marks, computer_marks, highlight_cells or [])
+
+    jobs = [(state, filename, fmt, dpi) for filename, state in pending.items()]
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            _render_batch(batch)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                                 initializer=_init_worker) as pool:
+            for _ in pool.map(_render_batch, batches):
+                pass
+
+    elapsed = time.perf_counter() - start
+    return ExportReport(files, len(jobs), len(files) - len(jobs), elapsed)
+
+
+# Benchmark the batch export if run as a script
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    renderer = BoardRenderer()
+    values = [v for row in renderer.board_numbers for v in row]
+    random.seed(0)
+
+    states = []
+    for _ in range(200):
+        taken = random.sample(values, random.randint(0, 20))
+        half = len(taken) // 2
+        states.append((taken[:half], taken[half:], []))
+    states.extend(states[:50])  # Repeated positions are served from the cache
+
+    out_dir = tempfile.mkdtemp()
+    report = export_board_images(states, out_dir, fmt="png", dpi=100)
+    print(f"Exported to {out_dir}")
+    print(report)
@@ -0,0 +1,281 @@
+import hashlib
+import math
+import os
+from functools import lru_cache
+
+# Environment variable naming shared tables (see shared_tables.py) that
+# worker processes attach to instead of building the default spec
+TABLES_ENV = "MULTIPLICATION_GAME_TABLES"
+
+
+def default_board(selectors):
+    """Every distinct product of two selectors, row by row, as close to square as possible"""
+    products = sorted({a * b for a in selectors for b in selectors})
+    cols = math.ceil(math.sqrt(len(products)))
+    rows = math.ceil(len(products) / cols)
+    products += [None] * (rows * cols - len(products))
+    return [products[i * cols:(i + 1) * cols] for i in range(rows)]
+
+
+def spec_fingerprint(selectors, win_length, board_numbers):
+    """Short hash identifying a set of rules"""
+    text = f"{tuple(selectors)}|{win_length}|{board_numbers}"
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class BoardSpec:
+    def __init__(self, selectors=range(1, 10), win_length=4, board_numbers=None):
+        """
+        Board and rule specification shared by all game modules
+
+        The board, the selector products table, the win patterns and their
+        bitmasks and the reverse indexes are generated once here. Cells are
+        numbered row by row; bit k of a mask is grid cell k. Masks are plain
+        Python ints, so boards with more than 64 cells need no special case.
+
+        Args:
+            selectors: Numbers available on the selector
+            win_length: Number of marks in a row needed to win
+            board_numbers: Optional 2D list of board numbers. By default the
+                board holds every distinct product of two selectors in
+                increasing order, as close to square as possible. Cells
+                left over in the last row are None (holes).
+        """
+        self.selectors = tuple(selectors)
+        self.win_length = win_length
+
+        if board_numbers is None:
+            board_numbers = default_board(self.selectors)
+        self._set_board(board_numbers)
+
+        # Win patterns, as board values, cell indexes and bitmasks
+        self._set_patterns(self._generate_win_pattern_cells())
+
+        # Products table: selector -> [(multiplicand, product)] and target bitmask
+        self.products = {selector: self.find_products(selector) for selector in self.selectors}
+        self._set_targets({selector: sum(self.value_bits[product] for _, product in products)
+                           for selector, products in self.products.items()})
+
+        self.fingerprint = spec_fingerprint(self.selectors, self.win_length, self.board_numbers)
+
+    @classmethod
+    def from_tables(cls, registry):
+        """
+        Spec rebuilt from tables published by shared_tables.publish_spec_tables
+
+        Win patterns, their masks and the products table are read from the
+        shared arrays instead of being generated again, but the spec itself
+        is not shared: the search works on Python int masks, dicts and
+        lists, so every process converts the arrays into its own copy
+        (about 30 KB for the 1-9 board, 120 KB for 1-16). Only tables used
+        as arrays, such as the evaluator's (see evaluator_from_tables),
+        stay zero-copy views.
+        """
+        spec = cls.__new__(cls)
+        rows, cols, win_length = (int(x) for x in registry["spec_shape"])
+        spec.selectors = tuple(int(s) for s in registry["selectors"])
+        spec.win_length = win_length
+        values = [None if v < 0 else int(v) for v in registry["board_values"]]
+        spec._set_board([values[i * cols:(i + 1) * cols] for i in range(rows)])
+
+        spec._set_patterns([tuple(int(k) for k in cells)
+                            for cells in registry["win_pattern_cells"]],
+                           [spec.from_words(words) for words in registry["win_mask_words"]])
+
+        spec.products = {selector: [] for selector in spec.selectors}
+        for selector, multiplicand, product in registry["products"].tolist():
+            spec.products[selector].append((multiplicand, product))
+        spec._set_targets({selector: spec.from_words(words) for selector, words
+                           in zip(spec.selectors, registry["selector_target_words"])})
+
+        spec.fingerprint = bytes(registry["spec_fingerprint"]).decode()
+        return spec
+
+    def _set_board(self, board_numbers):
+        """Board shape, cell tables and reverse indexes"""
+        self.board_numbers = board_numbers
+        self.rows = len(board_numbers)
+        self.cols = len(board_numbers[0])
+        self.n_cells = self.rows * self.cols
+        self.n_words = (self.n_cells + 63) // 64  # 64-bit words needed per bitboard
+
+        self.values = [board_numbers[i][j] for i in range(self.rows) for j in range(self.cols)]
+        self.value_positions = {}
+        self.value_index = {}
+        self.value_bits = {}
+        for index, value in enumerate(self.values):
+            if value is None:
+                continue
+            self.value_positions[value] = divmod(index, self.cols)
+            self.value_index[value] = index
+            self.value_bits[value] = 1 << index
+        self.n_values = len(self.value_index)
+        self.full_mask = sum(self.value_bits.values())
+
+    def _set_patterns(self, win_pattern_cells, win_masks=None):
+        """Win patterns as board values and masks, and the cell -> patterns index"""
+        self.win_pattern_cells = win_pattern_cells
+        self.win_patterns = [[self.values[k] for k in cells] for cells in win_pattern_cells]
+        if win_masks is None:
+            win_masks = [sum(1 << k for k in cells) for cells in win_pattern_cells]
+        self.win_masks = win_masks
+        cell_patterns = [[] for _ in range(self.n_cells)]
+        for p, cells in enumerate(win_pattern_cells):
+            for k in cells:
+                cell_patterns[k].append(p)
+        self.cell_patterns = [tuple(patterns) for patterns in cell_patterns]
+
+    def _set_targets(self, selector_targets):
+        self.selector_targets = selector_targets
+        self.reachable_mask = 0
+        for mask in selector_targets.values():
+            self.reachable_mask |= mask
+
+    def _generate_win_pattern_cells(self):
+        """Generate all winning lines (win_length in a row) that avoid holes"""
+        n = self.win_length
+        lines = []
+        directions = [
+            (range(self.rows), range(self.cols - n + 1), 0, 1),          # Horizontal
+            (range(self.rows - n + 1), range(self.cols), 1, 0),          # Vertical
+            (range(self.rows - n + 1), range(self.cols - n + 1), 1, 1),  # Diagonal
+            (range(n - 1, self.rows), range(self.cols - n + 1), -1, 1),  # Anti-diagonal
+        ]
+        for row_range, col_range, di, dj in directions:
+            for i in row_range:
+                for j in col_range:
+                    cells = tuple((i + di * k) * self.cols + j + dj * k for k in range(n))
+                    if all(self.values[k] is not None for k in cells):
+                        lines.append(cells)
+        return lines
+
+    def find_products(self, selector_num):
+        """All (multiplicand, product) pairs on the board for a selector number"""
+        products = []
+        for num in self.values:
+            if num is not None and selector_num * num in self.value_bits:
+                products.append((num, selector_num * num))
+        return products
+
+    def mask_of(self, values):
+        """Bitmask of a collection of board values (values not on the board are ignored)"""
+        bits = self.value_bits
+        mask = 0
+        for value in values:
+            mask |= bits.get(value, 0)
+        return mask
+
+    def values_of(self, mask):
+        """Board values of the bits set in a mask"""
+        values = []
+        while mask:
+            low = mask & -mask
+            values.append(self.values[low.bit_length() - 1])
+            mask ^= low
+        return values
+
+    def winning_pattern(self, mask):
+        """Index of a win pattern fully covered by mask, or -1"""
+        for p, win in enumerate(self.win_masks):
+            if mask & win == win:
+                return p
+        return -1
+
+    def completes_win(self, mask, index):
+        """Check whether mask wins through a pattern containing cell index"""
+        win_masks = self.win_masks
+        for p in self.cell_patterns[index]:
+            win = win_masks[p]
+            if mask & win == win:
+                return True
+        return False
+
+    def to_words(self, mask):
+        """Split a bitmask into n_words 64-bit words, least significant first"""
+        return [(mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for w in range(self.n_words)]
+
+    def from_words(self, words):
+        """Join 64-bit words (least significant first) into a bitmask"""
+        mask = 0
+        for w, word in enumerate(words):
+            mask |= int(word) << (64 * w)
+        return mask
+
+
+# Specs of this process by fingerprint, including those taken from shared tables
+_specs = {}
+
+
+@lru_cache(maxsize=None)
+def _cached_spec(selectors, win_length, board):
+    board_numbers = [list(row) for row in board] if board is not None else None
+    fingerprint = spec_fingerprint(selectors, win_length,
+                                   board_numbers or default_board(selectors))
+    if fingerprint not in _specs:
+        _specs[fingerprint] = BoardSpec(selectors, win_length, board_numbers)
+    return _specs[fingerprint]
+
+
+def get_spec(selectors=range(1, 10), win_length=4, board_numbers=None):
+    """
+    Return the shared BoardSpec for a set of rules
+
+    Specs are built once per process and reused by every module that asks
+    for the same rules.
+    """
+    board = tuple(tuple(row) for row in board_numbers) if board_numbers is not None else None
+    return _cached_spec(tuple(selectors), win_length, board)
+
+
+def use_tables(registry):
+    """
+    Take the spec described by an attached TableRegistry
+
+    Later get_spec calls for the same rules return it. A spec this process
+    already built is returned as is.
+    """
+    fingerprint = bytes(registry["spec_fingerprint"]).decode()
+    if fingerprint not in _specs:
+        _specs[fingerprint] = BoardSpec.from_tables(registry)
+    return _specs[fingerprint]
+
+
+def _attach_env_tables():
+    """Attach to the tables named in TABLES_ENV, if a parent process published them"""
+    namespace = os.environ.get(TABLES_ENV)
+    if not namespace:
+        return
+    from shared_tables import TableRegistry
+    try:
+        use_tables(TableRegistry.attach(namespace))
+    except (FileNotFoundError, ValueError):
+        pass  # Published by a process that has gone, or another layout version
+
+
+def spec_for_board(board_numbers):
+    """Shared BoardSpec for a 2D board, the default spec if it is the default board"""
+    if board_numbers is None or board_numbers == DEFAULT_SPEC.board_numbers:
+        return DEFAULT_SPEC
+    return get_spec(board_numbers=board_numbers)
+
+
+# The standard game: selectors 1-9, a 6x6 board, four in a row
+_attach_env_tables()
+DEFAULT_SPEC = get_spec()
+
+
+# Show the standard and a larger variant if run as a script
+if __name__ == "__main__":
+    import time
+
+    for selectors, win_length in ((range(1, 10), 4), (range(1, 13), 5), (range(1, 17), 5)):
+        start = time.perf_counter()
+        spec = get_spec(selectors, win_length)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Selectors {spec.selectors[0]}-{spec.selectors[-1]}, {win_length} in a row: "
+              f"{spec.rows}x{spec.cols} board, {spec.n_values} cells, "
+              f"{len(spec.win_masks)} win patterns, {spec.n_words} word bitboards "
+              f"(built in {elapsed:.1f} ms)")
+
+    for row in DEFAULT_SPEC.board_numbers:
+        print(row)
@@ -1,64 +1,67 @@
 import random
 
+from analysis import Analyzer
+from difficulty import get_level
+from search import Searcher
+from threat_search import ThreatSolver
+
 class ComputerPlayer:
-    def __init__(self, board_numbers, validator):
+    def __init__(self, board_numbers, validator, cache=None, evaluator=None, seed=None):
         """
         Initialize the computer player
         
         Args:
             board_numbers: 2D list of board numbers
             validator: MoveValidator object
+            cache: Optional EvalCache so search results survive between runs
+                   (moves then also depend on what earlier runs stored)
+            evaluator: Optional learned Evaluator for the search to use
+            seed: Optional seed; the same seed replays the same moves
         """
         self.board_numbers = board_numbers
         self.validator = validator
-        self.difficulty = "normal"  # Options: "easy", "normal", "hard"
+        self.rng = random.Random(seed)
+        
+        # Every level searches; the levels differ in budget and noise, and the
+        # stronger ones try the threat solver first (see difficulty.py)
+        self.threat_solver = ThreatSolver(validator.spec, validator)
+        self.searcher = Searcher(validator.spec, cache=cache, evaluator=evaluator,
+                                 threat_solver=self.threat_solver)
+        self.analyzer = Analyzer(self.searcher)
+        self.level = get_level("normal")
+        self.difficulty = self.level.name
+        self._planned_move = None
     
     def set_difficulty(self, difficulty):
-        """Set the difficulty level of the computer player"""
-        if difficulty in ["easy", "normal", "hard"]:
-            self.difficulty = difficulty
-        else:
-            raise ValueError("Difficulty must be 'easy', 'normal', or 'hard'")
+        """Set the difficulty level: a name from difficulty.LEVELS or a Level"""
+        self.level = get_level(difficulty)
+        self.difficulty = self.level.name
+    
+    def seed(self, seed):
+        """Restart the random stream and forget earlier searches, for reproducible games"""
+        self.rng.seed(seed)
+        self.searcher.table.clear()
+        self.threat_solver.table.clear()
     
     def choose_selector_number(self, player_marks, computer_marks):
-        """Choose a selector number (1-9) based on the current game state"""
-        # Count how many valid moves each selector number gives
-        selector_options = {}
-        for selector in range(1, 10):
-            valid_moves = self.validator.get_valid_moves(selector, player_marks, computer_marks)
-            selector_options[selector] = len(valid_moves)
+        """Choose a selector number based on the current game state"""
+        self._planned_move = None
         
-        if self.difficulty == "easy":
-            # Easy: Pick a selector with at least one valid move, but not necessarily the best
-            possible_selectors = [s for s, count in selector_options.items() if count > 0]
-            if possible_selectors:
-                return random.choice(possible_selectors)
-            return random.randint(1, 9)  # Fallback
-            
-        elif self.difficulty == "normal":
-            # Normal: Prefer selectors with more valid moves
-            max_moves = max(selector_options.values(), default=0)
-            if max_moves > 0:
-                good_selectors = [s for s, count in selector_options.items() 
-                                 if count >= max_moves * 0.7]  # At least 70% as good as the best
-                return random.choice(good_selectors)
-            return random.randint(1, 9)  # Fallback
-            
-        else:  # Hard
-            # Hard: Always pick the selector with the most valid moves
-            max_moves = max(selector_options.values(), default=0)
-            if max_moves > 0:
-                best_selectors = [s for s, count in selector_options.items() 
-                                 if count == max_moves]
-                return random.choice(best_selectors)
-            return random.randint(1, 9)  # Fallback
+        # Search for a cell within the level's budget, then pick a selector that reaches it
+        own, opp = self.searcher.position(computer_marks, player_marks)
+        move = self.level.choose(self.analyzer, own, opp, self.rng)
+        if move is not None:
+            selector = self.searcher.selector_for(move)
+            self._planned_move = (selector, move)
+            return selector
+        return self.rng.choice(self.validator.spec.selectors)  # No move left
     
     def choose_move(self, selector_num, player_marks, computer_marks, game_logic=None):
         """
         Choose a move for the computer based on the selector number
         
         Args:
-            selector_num: Number selected from the selector (1-9)
+            selector_num: Number selected from the selector
             player_marks: Set of values already marked by the player
             computer_marks: Set of values already marked by the computer
             game_logic: Optional GameLogic object for win detection
@@ -70,15 +73,22 @@ class ComputerPlayer:
         
         if not valid_moves:
             return None  # No valid moves available
+        
+        # Play the move found when the selector was chosen
+        if self._planned_move is not None and self._planned_move[0] == selector_num:
+            planned = self._planned_move[1]
+            self._planned_move = None
+            if any(product == planned for _, product in valid_moves):
+                return planned
             
-        # If we have game logic and are playing on hard, look for winning moves
-        if game_logic and self.difficulty == "hard":
+        # The selector was not our choice: take a win or a block if there is one
+        if game_logic:
             # Check if any move would result in a win
             for _, product in valid_moves:
                 # Simulate marking this position
                 test_marks = computer_marks.copy()
                 test_marks.add(product)
-                if game_logic.check_win(test_marks):
+                if game_logic.check_win(test_marks)[0]:
                     return product  # This move wins!
             
             # Check if any move would block the player from winning
@@ -86,11 +96,11 @@ class ComputerPlayer:
                 # Simulate the player marking this position
                 test_marks = player_marks.copy()
                 test_marks.add(product)
-                if game_logic.check_win(test_marks):
+                if game_logic.check_win(test_marks)[0]:
                     return product  # Block this winning move!
         
         # Otherwise, make a random choice among valid moves
-        _, target_value = random.choice(valid_moves)
+        _, target_value = self.rng.choice(valid_moves)
         return target_value
 
 # Test the computer player if run as a script
@@ -98,20 +108,12 @@ if __name__ == "__main__":
     # Import needed modules for testing
     import sys
     sys.path.append('.')
+    from board_spec import DEFAULT_SPEC
     from move_validation import MoveValidator
     
-    # Example board
-    board_numbers = [
-        [1, 2, 3, 4, 5, 6],
-        [7, 8, 9, 10, 12, 14],
-        [15, 16, 18, 20, 21, 24],
-        [25, 27, 28, 30, 32, 35],
-        [36, 40, 42, 45, 48, 49],
-        [54, 56, 63, 64, 72, 81]
-    ]
-    
+    board_numbers = DEFAULT_SPEC.board_numbers
     validator = MoveValidator(board_numbers)
-    computer = ComputerPlayer(board_numbers, validator)
+    computer = ComputerPlayer(board_numbers, validator, seed=1)
     
     # Test with empty board
     selector = computer.choose_selector_number(set(), set())
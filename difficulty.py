@@ -0,0 +1,311 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analysis import Analyzer
+from board_spec import DEFAULT_SPEC
+from search import Searcher, THREAT_SHARE
+from shared_tables import attach_spec, shared_spec_tables
+from threat_search import ThreatSolver
+
+# Share of a level's move time the search may use
+DEADLINE_SHARE = 0.8
+
+
+class Level:
+    def __init__(self, name, max_depth, node_limit, temperature, move_time, threat_depth=0):
+        """
+        A difficulty level defined by its search budget
+
+        The node budget decides how far the search gets, so with the same
+        seed a level plays the same moves on any machine. The move time is
+        a hard cap on top of it and the latency guarantee: the search stops
+        when it runs out, which only happens on hardware far slower than
+        the budget assumes. The search deadline sits at DEADLINE_SHARE of
+        the move time, leaving room for the budget check interval and for
+        picking the move; calibrate() counts the moves that still took the
+        full move time, i.e. violations of the guarantee.
+
+        Levels with a threat depth first run the searcher's threat solver on
+        THREAT_SHARE of the budget and play a forced win when it finds one.
+
+        Args:
+            name: Name of the level
+            max_depth: Deepest search iteration, in plies
+            node_limit: Node budget per move
+            temperature: Noise in static score units; moves are drawn with
+                         probability proportional to exp(score / temperature),
+                         with the temperature scaled to the searcher's scores.
+                         0 always plays the best move.
+            move_time: Guaranteed upper bound of the move latency in seconds
+            threat_depth: Attacker moves the threat solver may look ahead;
+                          0 skips it
+        """
+        self.name = name
+        self.max_depth = max_depth
+        self.node_limit = node_limit
+        self.temperature = temperature
+        self.move_time = move_time
+        self.threat_depth = threat_depth
+
+    def threat_move(self, analyzer, own, opp):
+        """First move of a forced win found by the threat solver, or None"""
+        solver = analyzer.searcher.threat_solver
+        if not self.threat_depth or solver is None:
+            return None
+        forced = solver.solve(own, opp, max_depth=self.threat_depth,
+                              time_limit=self.move_time * DEADLINE_SHARE * THREAT_SHARE,
+                              node_limit=int(self.node_limit * THREAT_SHARE))
+        return forced.first_move if forced is not None else None
+
+    def analyse(self, analyzer, own, opp, time_limit=None):
+        """Last complete analysis within the budget (a partial one if none completed)"""
+        if time_limit is None:
+            time_limit = self.move_time * DEADLINE_SHARE
+        last = None
+        for update in analyzer.analyse(own, opp, max_depth=self.max_depth,
+                                       time_limit=time_limit, node_limit=self.node_limit):
+            if update.complete or last is None:
+                last = update
+        return last
+
+    def choose(self, analyzer, own, opp, rng):
+        """
+        Pick a move for the side to move
+
+        Args:
+            analyzer: Analyzer used for the search
+            own: Mask of the side to move
+            opp: Mask of the opponent
+            rng: random.Random that draws the noise
+
+        Returns:
+            Board value to mark, or None if there is no legal move
+        """
+        start = time.perf_counter()
+        move = self.threat_move(analyzer, own, opp)
+        if move is not None:
+            return move
+        # The analysis gets what the pre-pass left of the search budget
+        time_limit = self.move_time * DEADLINE_SHARE - (time.perf_counter() - start)
+        update = self.analyse(analyzer, own, opp, max(time_limit, 0.0))
+        if update is None:
+            moves = analyzer.searcher.legal_moves(own, opp)
+            return analyzer.spec.values[rng.choice(moves)] if moves else None
+        if self.temperature <= 0:
+            return update.best.move
+        best = update.best.score
+        temperature = self.temperature * analyzer.searcher.score_scale
+        weights = [math.exp(max(m.score - best, -50 * temperature) / temperature)
+                   for m in update.moves]
+        return rng.choices(update.moves, weights)[0].move
+
+    def __repr__(self):
+        return (f"Level({self.name!r}, max_depth={self.max_depth}, node_limit={self.node_limit}, "
+                f"temperature={self.temperature}, move_time={self.move_time}, "
+                f"threat_depth={self.threat_depth})")
+
+
+# Weakest first. Node budgets leave the move time a wide margin at roughly
+# 25,000 nodes per second.
+LEVELS = {level.name: level for level in [
+    Level("beginner", max_depth=1, node_limit=200, temperature=40, move_time=0.05),
+    Level("easy", max_depth=2, node_limit=600, temperature=12, move_time=0.1),
+    Level("normal", max_depth=3, node_limit=2000, temperature=4, move_time=0.25),
+    Level("hard", max_depth=5, node_limit=6000, temperature=0, move_time=0.5, threat_depth=4),
+    Level("expert", max_depth=8, node_limit=15000, temperature=0, move_time=1.0,
+          threat_depth=8),
+]}
+
+
+def get_level(level):
+    """Look up a level by name (a Level is returned as is)"""
+    if isinstance(level, Level):
+        return level
+    if level not in LEVELS:
+        raise ValueError(f"Difficulty must be one of {', '.join(repr(n) for n in LEVELS)}")
+    return LEVELS[level]
+
+
+def play_game(first, second, seed, opening_plies=2, spec=None):
+    """
+    Play one game between two levels
+
+    The seed picks a random opening and drives both players' noise, so a
+    (first, second, seed) triple always gives the same game.
+
+    Returns:
+        (outcome for the first player: 1, 0.5 or 0,
+         {level name: list of move latencies in seconds})
+    """
+    spec = spec or DEFAULT_SPEC
+    levels = [get_level(first), get_level(second)]
+    rngs = [random.Random(seed * 2 + side) for side in range(2)]
+    # Same players as ComputerPlayer, threat solver included
+    analyzers = [Analyzer(Searcher(spec, threat_solver=ThreatSolver(spec))) for _ in range(2)]
+    latencies = {level.name: [] for level in levels}
+
+    opening = random.Random(seed)
+    marks = [0, 0]
+    side = 0
+    for ply in range(spec.n_cells):
+        own, opp = marks[side], marks[1 - side]
+        if not spec.reachable_mask & ~(own | opp):
+            return 0.5, latencies
+
+        if ply < opening_plies:
+            moves = analyzers[side].searcher.legal_moves(own, opp)
+            k = opening.choice(sorted(moves))
+        else:
+            level = levels[side]
+            start = time.perf_counter()
+            value = level.choose(analyzers[side], own, opp, rngs[side])
+            latencies[level.name].append(time.perf_counter() - start)
+            k = spec.value_index[value]
+
+        marks[side] = own | 1 << k
+        if spec.completes_win(marks[side], k):
+            return (1.0 if side == 0 else 0.0), latencies
+        side = 1 - side
+    return 0.5, latencies
+
+
+# Spec of the calibration games in this process, set by _init_worker
+_spec = None
+
+
+def _init_worker(tables=None, spec=None):
+    global _spec
+    _spec = attach_spec(tables) if tables is not None else spec
+
+
+def _play_task(task):
+    first, second, seed, opening_plies = task
+    outcome, latencies = play_game(first, second, seed, opening_plies, _spec)
+    return first, second, outcome, latencies
+
+
+def fit_elo(games, names, prior_draws=1.0, iterations=500):
+    """
+    Bradley-Terry ratings from game results, on the Elo scale
+
+    Args:
+        games: List of (name_a, name_b, score of a)
+        names: Levels to rate; the first one is anchored at 0
+        prior_draws: Virtual draws added between neighbouring levels so
+                     that lopsided results still give finite ratings
+
+    Returns:
+        Array of ratings in the order of names
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    played = np.zeros((n, n))
+    wins = np.zeros(n)
+    for a, b, score in games:
+        i, j = index[a], index[b]
+        played[i, j] += 1
+        played[j, i] += 1
+        wins[i] += score
+        wins[j] += 1 - score
+    for i in range(n - 1):
+        played[i, i + 1] += prior_draws
+        played[i + 1, i] += prior_draws
+        wins[i] += prior_draws / 2
+        wins[i + 1] += prior_draws / 2
+
+    # Minorisation-maximisation updates (Hunter, 2004)
+    gamma = np.ones(n)
+    for _ in range(iterations):
+        denominator = (played / (gamma[:, None] + gamma[None, :])).sum(axis=1)
+        gamma = np.where(denominator > 0, wins / np.maximum(denominator, 1e-12), gamma)
+        gamma = np.maximum(gamma, 1e-12) / gamma[0]
+    return 400 * np.log10(gamma)
+
+
+def calibrate(levels=None, games_per_pair=40, workers=None, seed=0, opening_plies=2,
+              bootstrap=200, spec=None):
+    """
+    Round robin between levels, played in parallel
+
+    Every pair of levels plays games_per_pair games from seeded random
+    openings, each opening once with either level moving first.
+
+    Returns:
+        List of dicts per level: name, elo, elo_low/elo_high (95% bootstrap
+        interval), games, score, p50_ms, p99_ms, budget_ms and violations
+        (moves that took at least the move time)
+    """
+    names = [get_level(level).name for level in (levels or LEVELS)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = []
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            for g in range(games_per_pair):
+                opening = seed + g // 2
+                first, second = (a, b) if g % 2 == 0 else (b, a)
+                tasks.append((first, second, opening, opening_plies))
+
+    if workers <= 1:
+        _init_worker(spec=spec)
+        results = [_play_task(task) for task in tasks]
+    else:
+        # Workers attach to the published spec tables instead of rebuilding them
+        with shared_spec_tables(spec) as tables, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(tables,)) as pool:
+            results = list(pool.map(_play_task, tasks, chunksize=4))
+
+    games = []
+    latencies = {name: [] for name in names}
+    for first, second, outcome, times in results:
+        games.append((first, second, outcome))
+        for name, values in times.items():
+            latencies[name].extend(values)
+
+    ratings = fit_elo(games, names)
+    rng = np.random.default_rng(seed)
+    samples = np.array([fit_elo([games[i] for i in rng.integers(len(games), size=len(games))],
+                                names) for _ in range(bootstrap)])
+    low, high = np.percentile(samples, [2.5, 97.5], axis=0)
+
+    table = []
+    for i, name in enumerate(names):
+        own = [s if a == name else 1 - s for a, b, s in games if name in (a, b)]
+        times = np.array(latencies[name]) * 1000
+        budget = get_level(name).move_time * 1000
+        table.append({"name": name, "elo": ratings[i], "elo_low": low[i], "elo_high": high[i],
+                      "games": len(own), "score": sum(own) / len(own) if own else float("nan"),
+                      "p50_ms": np.percentile(times, 50) if len(times) else 0.0,
+                      "p99_ms": np.percentile(times, 99) if len(times) else 0.0,
+                      "budget_ms": budget, "violations": int((times >= budget).sum())})
+    return table
+
+
+# Calibrate the levels from the command line
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Estimate the Elo of each difficulty level")
+    parser.add_argument("--games", type=int, default=20, help="Games per pair of levels")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the openings")
+    parser.add_argument("--levels", nargs="*", default=list(LEVELS), help="Levels to include")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = calibrate(args.levels, args.games, args.workers, args.seed)
+    print(f"Played {sum(row['games'] for row in table) // 2} games "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"{'level':>10} {'Elo':>7} {'95% CI':>17} {'score':>6} {'p50 ms':>7} "
+          f"{'p99 ms':>7} {'budget':>7} {'over':>6}")
+    for row in table:
+        print(f"{row['name']:>10} {row['elo']:7.0f} "
+              f"[{row['elo_low']:6.0f}, {row['elo_high']:6.0f}] {row['score']:6.1%} "
+              f"{row['p50_ms']:7.1f} {row['p99_ms']:7.1f} {row['budget_ms']:7.0f} "
+              f"{row['violations']:6d}")
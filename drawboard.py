@@ -2,17 +2,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Polygon
 
+from board_spec import DEFAULT_SPEC
+
 class BoardRenderer:
-    def __init__(self):
-        # Define the numbers for the main game grid
-        self.board_numbers = [
-            [1, 2, 3, 4, 5, 6],
-            [7, 8, 9, 10, 12, 14],
-            [15, 16, 18, 20, 21, 24],
-            [25, 27, 28, 30, 32, 35],
-            [36, 40, 42, 45, 48, 49],
-            [54, 56, 63, 64, 72, 81]
-        ]
+    def __init__(self, spec=None):
+        # Numbers for the main game grid and the selector come from the board spec
+        self.spec = spec or DEFAULT_SPEC
+        self.board_numbers = self.spec.board_numbers
+        self.selectors = self.spec.selectors
         
         # Player and computer markers
         self.player_marks = set()
@@ -25,10 +22,11 @@ class BoardRenderer:
         self.cell_color = 'lightgray'
         self.text_color = 'black'
         self.highlight_color = 'yellow'
+        self.preview_color = 'lightskyblue'
         
     def draw_game_board(self, highlight_cells=None):
         """
-        Draw the main 6x6 game board with player and computer markings
+        Draw the main game board with player and computer markings
         
         Args:
             highlight_cells: Optional list of (row, col) tuples to highlight
@@ -47,7 +45,8 @@ class BoardRenderer:
         
         # Create the table
         table = ax.table(
-            cellText=[[str(self.board_numbers[i][j]) for j in range(6)] for i in range(6)],
+            cellText=[["" if value is None else str(value) for value in row]
+                      for row in self.board_numbers],
             loc='center',
             cellLoc='center',
             edges='closed'
@@ -59,22 +58,13 @@ class BoardRenderer:
         table.scale(1, 1.5)
         
         # Style each cell
-        for i in range(6):
-            for j in range(6):
+        for i in range(self.spec.rows):
+            for j in range(self.spec.cols):
                 cell = table[(i, j)]
                 cell.set_text_props(weight='bold', color=self.text_color)
                 cell.set_edgecolor('black')
                 
-                # Check if cell is marked by player or computer
-                value = self.board_numbers[i][j]
-                if value in self.player_marks:
-                    cell.set_facecolor(self.player_color)
-                elif value in self.computer_marks:
-                    cell.set_facecolor(self.computer_color)
-                elif (i, j) in highlight_cells:
-                    cell.set_facecolor(self.highlight_color)
-                else:
-                    cell.set_facecolor(self.cell_color)
+                cell.set_facecolor(self.cell_face_color(i, j, highlight_cells))
         
         # Add "YOUR TURN..." text above the board
         ax.text(0.5, 1.05, "YOUR TURN...", 
@@ -84,6 +74,20 @@ class BoardRenderer:
         plt.tight_layout()
         return fig, ax
     
+    def cell_face_color(self, row, col, highlight_cells=()):
+        """Return the fill colour of a board cell for the current markers"""
+        # Check if cell is marked by player or computer
+        value = self.board_numbers[row][col]
+        if value is None:  # Hole in a board that is not completely filled
+            return self.background_color
+        elif value in self.player_marks:
+            return self.player_color
+        elif value in self.computer_marks:
+            return self.computer_color
+        elif (row, col) in highlight_cells:
+            return self.highlight_color
+        return self.cell_color
+
     def draw_selector(self, selected_number=None):
         """
         Draw the horizontal number selector with triangles
@@ -100,7 +104,7 @@ class BoardRenderer:
         ax.axis('off')
         
         # Create horizontal number boxes
-        numbers = np.arange(1, 10).reshape(1, 9)  # Numbers 1-9 in a row
+        numbers = np.array(self.selectors).reshape(1, -1)  # Selector numbers in a row
         
         # Create table for the numbers
         table = ax.table(
@@ -111,12 +115,12 @@ class BoardRenderer:
         )
         
         # Style the table cells
-        for j in range(9):
+        for j, number in enumerate(self.selectors):
             cell = table[(0, j)]
             cell.set_text_props(weight='bold', fontsize=16, color=self.text_color)
             cell.set_edgecolor('black')
             
-            if selected_number == j + 1:  # Highlight the selected number
+            if selected_number == number:  # Highlight the selected number
                 cell.set_facecolor(self.highlight_color)
             else:
                 cell.set_facecolor(self.cell_color)
@@ -158,7 +162,8 @@ class BoardRenderer:
         ax2.axis('off')
         
         # Game instructions
-        plt.figtext(0.7, 0.7, "Move the markers on\nthe number line to\nmake products.\nFour in a row wins.", 
+        plt.figtext(0.7, 0.7, "Move the markers on\nthe number line to\nmake products.\n"
+                   f"{self.spec.win_length} in a row wins.", 
                    fontsize=12, color='white')
         
         # Player/Computer labels
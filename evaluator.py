@@ -0,0 +1,321 @@
+import hashlib
+import random
+
+import numpy as np
+
+from board_spec import DEFAULT_SPEC
+
+
+class Evaluator:
+    def __init__(self, spec=None, weights=None, pattern_matrix=None):
+        """
+        Linear position evaluator over pattern features
+
+        The value of a position for the side to move is tanh(features . w),
+        an estimate of the game result between -1 (loss) and 1 (win).
+
+        Features, from the point of view of the side to move:
+            - open patterns holding k own marks and no opponent marks,
+              for k = 1 .. win_length - 1, and the same for the opponent
+            - threats: empty cells that would complete a pattern, own and opponent
+            - double threats: whether there are two or more threats, own and opponent
+            - mobility: empty cells still on an open pattern, own and opponent
+            - bias
+
+        Args:
+            spec: BoardSpec of the game (defaults to the standard game)
+            weights: Optional weight vector; defaults to hand-set weights
+            pattern_matrix: Optional prebuilt cells x patterns incidence
+                            matrix, such as a view of shared tables
+        """
+        self.spec = spec or DEFAULT_SPEC
+        n = self.spec.win_length
+        self.feature_names = (
+            [f"own_open_{k}" for k in range(1, n)] + [f"opp_open_{k}" for k in range(1, n)] +
+            ["own_threats", "opp_threats", "own_double_threat", "opp_double_threat",
+             "own_mobility", "opp_mobility", "bias"])
+        self.n_features = len(self.feature_names)
+
+        # Pattern incidence matrix for the vectorised path: cells x patterns
+        if pattern_matrix is None:
+            pattern_matrix = np.zeros((self.spec.n_cells, len(self.spec.win_masks)),
+                                      dtype=np.int16)
+            for p, cells in enumerate(self.spec.win_pattern_cells):
+                pattern_matrix[list(cells), p] = 1
+        self.pattern_matrix = pattern_matrix
+        self.cell_valid = np.array([v is not None for v in self.spec.values])
+        self.pattern_scale = 1.0 / max(1, len(self.spec.win_masks))
+        self.cell_scale = 1.0 / max(1, self.spec.n_values)
+
+        if weights is None:
+            weights = self.default_weights()
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if self.weights.shape != (self.n_features,):
+            raise ValueError(f"Expected {self.n_features} weights, got {self.weights.shape}")
+
+    def default_weights(self):
+        """Hand-set weights: longer open lines and threats are worth more"""
+        n = self.spec.win_length
+        open_weights = [4.0 ** k for k in range(1, n)]
+        scale = 1.0 / open_weights[-1]
+        weights = ([w * scale for w in open_weights] + [-w * scale * 1.5 for w in open_weights] +
+                   [0.5, -1.0, 1.0, -2.0, 0.1, -0.1, 0.0])
+        return np.array(weights)
+
+    # Feature extraction
+
+    def features(self, own, opp):
+        """Feature vector of one position given as (own, opp) masks"""
+        n = self.spec.win_length
+        own_open = [0] * (n + 1)
+        opp_open = [0] * (n + 1)
+        own_threats = 0
+        opp_threats = 0
+        own_live = 0
+        opp_live = 0
+        empty = self.spec.full_mask & ~(own | opp)
+        for win in self.spec.win_masks:
+            mine = own & win
+            theirs = opp & win
+            if not theirs:
+                own_open[mine.bit_count()] += 1
+                own_live |= win
+                if mine.bit_count() == n - 1:
+                    own_threats |= win & empty
+            if not mine:
+                opp_open[theirs.bit_count()] += 1
+                opp_live |= win
+                if theirs.bit_count() == n - 1:
+                    opp_threats |= win & empty
+
+        ps, cs = self.pattern_scale, self.cell_scale
+        own_t = own_threats.bit_count()
+        opp_t = opp_threats.bit_count()
+        return np.array(
+            [c * ps for c in own_open[1:n]] + [c * ps for c in opp_open[1:n]] +
+            [own_t, opp_t, float(own_t >= 2), float(opp_t >= 2),
+             (own_live & empty).bit_count() * cs, (opp_live & empty).bit_count() * cs, 1.0])
+
+    def masks_to_bits(self, masks):
+        """(N, n_cells) 0/1 matrix of the bits of N masks"""
+        words = np.array([self.spec.to_words(m) for m in masks], dtype=np.uint64)
+        words = words.reshape(len(masks), self.spec.n_words)
+        shifts = np.arange(64, dtype=np.uint64)
+        bits = (words[:, :, None] >> shifts) & np.uint64(1)
+        return bits.reshape(len(masks), -1)[:, :self.spec.n_cells].astype(np.int16)
+
+    def features_batch(self, owns, opps):
+        """Feature matrix (N, n_features) of N positions, computed with matrix products"""
+        n = self.spec.win_length
+        own_bits = self.masks_to_bits(owns)
+        opp_bits = self.masks_to_bits(opps)
+        empty = (1 - own_bits - opp_bits) * self.cell_valid
+
+        own_counts = own_bits @ self.pattern_matrix  # (N, patterns)
+        opp_counts = opp_bits @ self.pattern_matrix
+        own_open = opp_counts == 0
+        opp_open = own_counts == 0
+
+        columns = []
+        for k in range(1, n):
+            columns.append(((own_counts == k) & own_open).sum(1) * self.pattern_scale)
+        for k in range(1, n):
+            columns.append(((opp_counts == k) & opp_open).sum(1) * self.pattern_scale)
+
+        pattern_t = self.pattern_matrix.T
+        own_threat_cells = (((own_counts == n - 1) & own_open).astype(np.int16) @ pattern_t > 0)
+        opp_threat_cells = (((opp_counts == n - 1) & opp_open).astype(np.int16) @ pattern_t > 0)
+        own_t = (own_threat_cells & (empty > 0)).sum(1)
+        opp_t = (opp_threat_cells & (empty > 0)).sum(1)
+        own_live = (own_open.astype(np.int16) @ pattern_t > 0) & (empty > 0)
+        opp_live = (opp_open.astype(np.int16) @ pattern_t > 0) & (empty > 0)
+
+        columns += [own_t, opp_t, own_t >= 2, opp_t >= 2,
+                    own_live.sum(1) * self.cell_scale, opp_live.sum(1) * self.cell_scale,
+                    np.ones(len(owns))]
+        return np.column_stack(columns).astype(np.float64)
+
+    # Inference
+
+    def evaluate(self, own, opp):
+        """Value of one position for the side to move, in [-1, 1]"""
+        return float(np.tanh(self.features(own, opp) @ self.weights))
+
+    def evaluate_batch(self, owns, opps):
+        """Values of many positions for the side to move, one dot product"""
+        return np.tanh(self.features_batch(owns, opps) @ self.weights)
+
+    @property
+    def fingerprint(self):
+        """Short hash of the weights; results computed with other weights must not mix"""
+        return hashlib.blake2b(self.weights.tobytes(), digest_size=8).hexdigest()
+
+    # Persistence
+
+    def save(self, path):
+        """Save the weights to a small .npz file"""
+        np.savez(path, weights=self.weights, feature_names=np.array(self.feature_names),
+                 fingerprint=self.spec.fingerprint)
+
+    @classmethod
+    def load(cls, path, spec=None):
+        """Load weights saved by save"""
+        spec = spec or DEFAULT_SPEC
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != spec.fingerprint:
+                raise ValueError("Weights were trained for a different board")
+            return cls(spec, data["weights"])
+
+
+class TDTrainer:
+    def __init__(self, evaluator, alpha=0.05, lam=0.7, epsilon=0.1, seed=None):
+        """
+        Train an Evaluator with TD(lambda) from self-play
+
+        Several games are played in lockstep so that the successors of every
+        game's current position are featurised in a single batch.
+
+        Args:
+            evaluator: Evaluator whose weights are trained in place
+            alpha: Learning rate
+            lam: Trace decay (lambda)
+            epsilon: Probability of a random exploration move
+            seed: Optional random seed
+        """
+        self.evaluator = evaluator
+        self.spec = evaluator.spec
+        self.alpha = alpha
+        self.lam = lam
+        self.epsilon = epsilon
+        self.rng = random.Random(seed)
+
+    def _gradient(self, x):
+        v = np.tanh(x @ self.evaluator.weights)
+        return v, (1.0 - v * v) * x
+
+    def train(self, episodes, games_per_batch=32):
+        """
+        Play and learn from self-play games
+
+        Returns:
+            Dict with the number of games and first-mover wins, losses and draws
+        """
+        spec = self.spec
+        results = {"games": 0, "first_wins": 0, "second_wins": 0, "draws": 0}
+        while results["games"] < episodes:
+            n_games = min(games_per_batch, episodes - results["games"])
+            # Per game: own/opp masks (side to move first), move parity, trace
+            games = [{"own": 0, "opp": 0, "ply": 0, "trace": np.zeros_like(self.evaluator.weights),
+                      "z": None, "done": False} for _ in range(n_games)]
+            for game in games:
+                v, grad = self._gradient(self.evaluator.features(0, 0))
+                game["z"], game["trace"] = v, grad
+
+            while not all(game["done"] for game in games):
+                # Collect successors of every running game in one batch
+                owns, opps, owners = [], [], []
+                for g, game in enumerate(games):
+                    if game["done"]:
+                        continue
+                    free = spec.reachable_mask & ~(game["own"] | game["opp"])
+                    k = free
+                    while k:
+                        low = k & -k
+                        owns.append(game["opp"])
+                        opps.append(game["own"] | low)
+                        owners.append((g, low))
+                        k ^= low
+                values = self.evaluator.evaluate_batch(owns, opps) if owns else []
+
+                choices = {}
+                for (g, low), value in zip(owners, values):
+                    game = games[g]
+                    index = low.bit_length() - 1
+                    if spec.completes_win(game["own"] | low, index):
+                        value = -2.0  # Winning move: the opponent is lost
+                    best = choices.get(g)
+                    if best is None or value < best[0]:
+                        choices[g] = (value, low)
+
+                for g, game in enumerate(games):
+                    if game["done"]:
+                        continue
+                    candidates = [low for owner, low in owners if owner == g]
+                    if not candidates:
+                        self._finish(game, 0.0, results)
+                        continue
+                    value, low = choices[g]
+                    if value > -2.0 and self.rng.random() < self.epsilon:
+                        low = self.rng.choice(candidates)
+                    self._step(game, low, results)
+        return results
+
+    def _step(self, game, low, results):
+        """Play one move and apply the TD update"""
+        spec = self.spec
+        index = low.bit_length() - 1
+        own = game["own"] | low
+        sign = 1.0 if game["ply"] % 2 == 0 else -1.0  # Values are kept from the first mover's view
+
+        if spec.completes_win(own, index):
+            self._finish(game, sign, results)
+            return
+        if not spec.reachable_mask & ~(own | game["opp"]):
+            self._finish(game, 0.0, results)
+            return
+
+        game["own"], game["opp"] = game["opp"], own
+        game["ply"] += 1
+        v, grad = self._gradient(self.evaluator.features(game["own"], game["opp"]))
+        z = -sign * v
+        self.evaluator.weights += self.alpha * (z - game["z"]) * game["trace"]
+        game["trace"] = self.lam * game["trace"] - sign * grad
+        game["z"] = z
+
+    def _finish(self, game, outcome, results):
+        """Final TD update towards the game result (first mover's view)"""
+        self.evaluator.weights += self.alpha * (outcome - game["z"]) * game["trace"]
+        game["done"] = True
+        results["games"] += 1
+        if outcome > 0:
+            results["first_wins"] += 1
+        elif outcome < 0:
+            results["second_wins"] += 1
+        else:
+            results["draws"] += 1
+
+
+# Train from self-play if run as a script
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Train the evaluator by TD(lambda) self-play")
+    parser.add_argument("--episodes", type=int, default=500, help="Self-play games")
+    parser.add_argument("--batch", type=int, default=32, help="Games played in lockstep")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Learning rate")
+    parser.add_argument("--lam", type=float, default=0.7, help="Trace decay")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--out", default="evaluator_weights.npz", help="Weights file")
+    args = parser.parse_args()
+
+    evaluator = Evaluator()
+    trainer = TDTrainer(evaluator, alpha=args.alpha, lam=args.lam, seed=args.seed)
+    start = time.perf_counter()
+    results = trainer.train(args.episodes, args.batch)
+    elapsed = time.perf_counter() - start
+    print(f"Trained on {results['games']} games in {elapsed:.1f}s: "
+          f"{results['first_wins']} first-mover wins, {results['second_wins']} second-mover wins, "
+          f"{results['draws']} draws")
+    for name, weight in zip(evaluator.feature_names, evaluator.weights):
+        print(f"{name:>18}: {weight:+.4f}")
+
+    owns = [random.getrandbits(36) & DEFAULT_SPEC.full_mask for _ in range(5000)]
+    opps = [random.getrandbits(36) & ~own & DEFAULT_SPEC.full_mask for own in owns]
+    start = time.perf_counter()
+    evaluator.evaluate_batch(owns, opps)
+    elapsed = time.perf_counter() - start
+    print(f"Batch inference: {len(owns) / elapsed:,.0f} positions/s")
+
+    evaluator.save(args.out)
+    print(f"Saved weights to {args.out}")
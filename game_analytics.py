@@ -0,0 +1,371 @@
+import csv
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from board_spec import DEFAULT_SPEC
+from game_logic import GameLogic
+from move_validation import MoveValidator
+from computer_move import ComputerPlayer
+from difficulty import LEVELS
+
+DIFFICULTIES = list(LEVELS)
+PLAYERS = ["player", "computer"]
+
+
+class GameStats:
+    def __init__(self, spec=None):
+        """
+        Accumulate statistics over a stream of archived games
+
+        All counters are fixed-size NumPy arrays, so memory use does not
+        depend on how many games are added.
+
+        Args:
+            spec: BoardSpec of the archived games (defaults to the standard game)
+        """
+        spec = spec or DEFAULT_SPEC
+        self.spec = spec
+        self.game_logic = GameLogic(spec=spec)
+        self.values = [value for value in spec.values if value is not None]
+        self.cell_index = {value: i for i, value in enumerate(self.values)}
+        self.selector_index = {s: i for i, s in enumerate(spec.selectors)}
+
+        # Reverse index: cell -> win patterns that contain it
+        self.pattern_cells = [[self.cell_index[value] for value in pattern]
+                              for pattern in spec.win_patterns]
+        self.cell_patterns = [[] for _ in self.values]
+        for p, cells in enumerate(self.pattern_cells):
+            for cell in cells:
+                self.cell_patterns[cell].append(p)
+
+        n_cells = len(self.values)
+        n_patterns = len(self.pattern_cells)
+        self.games = 0
+        self.skipped = 0
+        self.first_cell_games = np.zeros(n_cells, dtype=np.int64)
+        self.first_cell_wins = np.zeros(n_cells, dtype=np.int64)
+        self.pattern_completions = np.zeros(n_patterns, dtype=np.int64)
+        self.selector_usage = np.zeros(len(spec.selectors), dtype=np.int64)
+        self.cell_usage = np.zeros(n_cells, dtype=np.int64)
+        self.difficulty_games = np.zeros(len(DIFFICULTIES), dtype=np.int64)
+        self.difficulty_moves = np.zeros(len(DIFFICULTIES), dtype=np.int64)
+        self.winner_counts = np.zeros(len(PLAYERS) + 1, dtype=np.int64)  # last slot: draws
+
+    def add_game(self, record):
+        """
+        Add one archived game
+
+        Args:
+            record: Dict with "moves" (list of [selector, value]), "first"
+                    ("player" or "computer") and optional "difficulty"
+
+        Returns:
+            True if the game was counted, False if it was malformed
+        """
+        moves = record.get("moves") or []
+        first = record.get("first", "player")
+        if first not in PLAYERS:
+            self.skipped += 1
+            return False
+
+        # Replay the game, tracking marks per pattern for each side
+        pattern_marks = np.zeros((2, len(self.pattern_cells)), dtype=np.int8)
+        taken = set()
+        winner = None
+        win_length = self.spec.win_length
+        side = PLAYERS.index(first)
+        parsed = []
+
+        for move in moves:
+            try:
+                selector, value = int(move[0]), int(move[1])
+            except (TypeError, ValueError, IndexError):
+                self.skipped += 1
+                return False
+            cell = self.cell_index.get(value)
+            if cell is None or cell in taken or selector not in self.selector_index:
+                self.skipped += 1
+                return False
+            if not self.spec.selector_targets[selector] & self.spec.value_bits[value]:
+                self.skipped += 1
+                return False  # The selector cannot produce this value
+            parsed.append((selector, cell))
+            taken.add(cell)
+
+            patterns = self.cell_patterns[cell]
+            pattern_marks[side, patterns] += 1
+            completed = [p for p in patterns if pattern_marks[side, p] == win_length]
+            if completed:
+                winner = side
+                self.pattern_completions[completed] += 1
+                break
+            side = 1 - side
+
+        if not parsed:
+            self.skipped += 1
+            return False
+
+        # Everything checked out, so commit the per-move counters
+        self.games += 1
+        for selector, cell in parsed:
+            self.selector_usage[self.selector_index[selector]] += 1
+            self.cell_usage[cell] += 1
+
+        first_cell = parsed[0][1]
+        self.first_cell_games[first_cell] += 1
+        if winner == PLAYERS.index(first):
+            self.first_cell_wins[first_cell] += 1
+        self.winner_counts[len(PLAYERS) if winner is None else winner] += 1
+
+        difficulty = record.get("difficulty")
+        if difficulty in DIFFICULTIES:
+            d = DIFFICULTIES.index(difficulty)
+            self.difficulty_games[d] += 1
+            self.difficulty_moves[d] += len(parsed)
+        return True
+
+    def merge(self, other):
+        """Add the counters of another GameStats into this one"""
+        self.games += other.games
+        self.skipped += other.skipped
+        for name in ("first_cell_games", "first_cell_wins", "pattern_completions",
+                     "selector_usage", "cell_usage", "difficulty_games",
+                     "difficulty_moves", "winner_counts"):
+            getattr(self, name)[...] += getattr(other, name)
+        return self
+
+    def first_cell_win_rates(self):
+        """Win rate of the first mover, indexed by the first cell taken"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.first_cell_games > 0,
+                            self.first_cell_wins / self.first_cell_games, np.nan)
+
+    def average_game_lengths(self):
+        """Average number of moves per game for each difficulty"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.difficulty_games > 0,
+                            self.difficulty_moves / self.difficulty_games, np.nan)
+
+    def write_tables(self, out_dir):
+        """
+        Write the summary tables as CSV files
+
+        Args:
+            out_dir: Directory to write the tables into
+
+        Returns:
+            List of the files written
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+
+        def write(name, header, rows):
+            path = os.path.join(out_dir, name)
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+            written.append(path)
+
+        rates = self.first_cell_win_rates()
+        write("first_cell.csv", ["value", "row", "col", "games", "first_mover_wins", "win_rate"],
+              [(value, *self.game_logic.value_positions[value], int(self.first_cell_games[i]),
+                int(self.first_cell_wins[i]), "" if np.isnan(rates[i]) else f"{rates[i]:.4f}")
+               for i, value in enumerate(self.values)])
+
+        write("win_patterns.csv", ["pattern", "completions"],
+              [(" ".join(str(v) for v in pattern), int(self.pattern_completions[p]))
+               for p, pattern in enumerate(self.game_logic.win_patterns)])
+
+        write("selectors.csv", ["selector", "uses"],
+              [(s, int(self.selector_usage[i])) for i, s in enumerate(self.spec.selectors)])
+
+        lengths = self.average_game_lengths()
+        write("difficulty.csv", ["difficulty", "games", "average_length"],
+              [(d, int(self.difficulty_games[i]), "" if np.isnan(lengths[i]) else f"{lengths[i]:.2f}")
+               for i, d in enumerate(DIFFICULTIES)])
+
+        write("results.csv", ["result", "games"],
+              [(name, int(count)) for name, count in zip(PLAYERS + ["draw"], self.winner_counts)])
+        return written
+
+
+def iter_game_chunks(path, start=0, end=None, chunk_size=1000):
+    """
+    Stream games from a JSON-lines archive in chunks
+
+    Only lines that start inside [start, end) are read, so an archive can be
+    split into byte ranges that are processed independently.
+
+    Args:
+        path: Archive file with one JSON game record per line
+        start: Byte offset to start reading from
+        end: Byte offset to stop at (defaults to the end of the file)
+        chunk_size: Number of records per chunk
+
+    Yields:
+        Lists of at most chunk_size records (None for unparseable lines)
+    """
+    if end is None:
+        end = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        if start > 0:
+            # Skip the line that straddles the boundary; the previous range owns it
+            f.seek(start - 1)
+            f.readline()
+        chunk = []
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                chunk.append(json.loads(line))
+            except ValueError:
+                chunk.append(None)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def analyse_range(path, start=0, end=None, chunk_size=1000, spec=None):
+    """Accumulate statistics for one byte range of an archive"""
+    stats = GameStats(spec)
+    for chunk in iter_game_chunks(path, start, end, chunk_size):
+        for record in chunk:
+            if record is None:
+                stats.skipped += 1
+            else:
+                stats.add_game(record)
+    return stats
+
+
+def split_archive(path, parts):
+    """Split an archive into roughly equal byte ranges"""
+    size = os.path.getsize(path)
+    parts = max(1, min(parts, size))
+    bounds = [size * i // parts for i in range(parts + 1)]
+    return [(path, bounds[i], bounds[i + 1]) for i in range(parts) if bounds[i] < bounds[i + 1]]
+
+
+def analyse_archives(paths, workers=None, chunk_size=1000, spec=None):
+    """
+    Compute statistics over one or more archives
+
+    Each archive is split into byte ranges which are analysed in worker
+    processes; the partial results are merged at the end.
+
+    Args:
+        paths: List of archive files
+        workers: Number of worker processes (None uses the CPU count,
+                 0 or 1 runs everything in this process)
+        chunk_size: Number of records read at a time
+        spec: BoardSpec of the archived games (defaults to the standard game)
+
+    Returns:
+        Merged GameStats
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    ranges = []
+    for path in paths:
+        ranges.extend(split_archive(path, max(1, workers)))
+
+    total = GameStats(spec)
+    if workers <= 1:
+        for path, start, end in ranges:
+            total.merge(analyse_range(path, start, end, chunk_size, spec))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyse_range, path, start, end, chunk_size, spec)
+                   for path, start, end in ranges]
+        for future in futures:
+            total.merge(future.result())
+    return total
+
+
+def record_self_play(path, n_games, difficulty="normal", seed=None, spec=None):
+    """
+    Append computer-vs-computer games to an archive
+
+    Args:
+        path: Archive file to append to
+        n_games: Number of games to play
+        difficulty: Difficulty of both computer players
+        seed: Optional random seed
+        spec: BoardSpec of the game (defaults to the standard game)
+
+    Returns:
+        Number of games written
+    """
+    spec = spec or DEFAULT_SPEC
+    rng = random.Random(seed)
+    validator = MoveValidator(spec=spec)
+    game_logic = GameLogic(spec=spec)
+    computer = ComputerPlayer(spec.board_numbers, validator, seed=seed)
+    computer.set_difficulty(difficulty)
+
+    with open(path, "a") as f:
+        for _ in range(n_games):
+            marks = {"player": set(), "computer": set()}
+            side = rng.choice(PLAYERS)
+            record = {"first": side, "difficulty": difficulty, "moves": []}
+            while True:
+                own, other = marks[side], marks[PLAYERS[1 - PLAYERS.index(side)]]
+                selector = computer.choose_selector_number(other, own)
+                move = computer.choose_move(selector, other, own)
+                if move is None:
+                    break
+                own.add(move)
+                record["moves"].append([selector, move])
+                if game_logic.check_win(own)[0] or game_logic.check_draw(own, other):
+                    break
+                side = PLAYERS[1 - PLAYERS.index(side)]
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return n_games
+
+
+# Analyse archives from the command line
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Summarise archived games")
+    parser.add_argument("archives", nargs="*", help="JSON-lines game archives")
+    parser.add_argument("--out", default="analytics", help="Directory for the summary tables")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records per chunk")
+    args = parser.parse_args()
+
+    archives = args.archives
+    if not archives:
+        # No archive given: build a small demo archive from self-play
+        demo = os.path.join(tempfile.mkdtemp(), "demo_games.jsonl")
+        for level in DIFFICULTIES:
+            record_self_play(demo, 10, level, seed=DIFFICULTIES.index(level))
+        archives = [demo]
+        print(f"Wrote demo archive: {demo}")
+
+    start = time.perf_counter()
+    stats = analyse_archives(archives, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"Analysed {stats.games} games ({stats.skipped} skipped) in {elapsed:.2f}s")
+    for level, length in zip(DIFFICULTIES, stats.average_game_lengths()):
+        print(f"Average length ({level}): {length:.2f}")
+    for path in stats.write_tables(args.out):
+        print(f"Wrote {path}")
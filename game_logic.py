@@ -1,53 +1,23 @@
+from board_spec import spec_for_board, DEFAULT_SPEC
+
 class GameLogic:
-    def __init__(self, board_numbers):
+    def __init__(self, board_numbers=None, spec=None):
         """
         Initialize the game logic
         
         Args:
             board_numbers: 2D list of the board numbers
+            spec: Optional BoardSpec; defaults to the shared spec for board_numbers
         """
-        self.board_numbers = board_numbers
-        self.rows = len(board_numbers)
-        self.cols = len(board_numbers[0])
-        
-        # Create position mapping from values to coordinates
-        self.value_positions = {}
-        for i in range(self.rows):
-            for j in range(self.cols):
-                self.value_positions[board_numbers[i][j]] = (i, j)
-        
-        # Initialize win patterns
-        self.win_patterns = self._generate_win_patterns()
-    
-    def _generate_win_patterns(self):
-        """Generate all possible winning patterns (4 in a row)"""
-        patterns = []
-        
-        # Horizontal wins
-        for i in range(self.rows):
-            for j in range(self.cols - 3):
-                pattern = [self.board_numbers[i][j+k] for k in range(4)]
-                patterns.append(pattern)
+        self.spec = spec or spec_for_board(board_numbers)
+        self.board_numbers = self.spec.board_numbers
+        self.rows = self.spec.rows
+        self.cols = self.spec.cols
+        self.win_length = self.spec.win_length
         
-        # Vertical wins
-        for i in range(self.rows - 3):
-            for j in range(self.cols):
-                pattern = [self.board_numbers[i+k][j] for k in range(4)]
-                patterns.append(pattern)
-        
-        # Diagonal wins (top-left to bottom-right)
-        for i in range(self.rows - 3):
-            for j in range(self.cols - 3):
-                pattern = [self.board_numbers[i+k][j+k] for k in range(4)]
-                patterns.append(pattern)
-        
-        # Diagonal wins (bottom-left to top-right)
-        for i in range(3, self.rows):
-            for j in range(self.cols - 3):
-                pattern = [self.board_numbers[i-k][j+k] for k in range(4)]
-                patterns.append(pattern)
-                
-        return patterns
+        # Position mapping and win patterns are precomputed by the spec
+        self.value_positions = self.spec.value_positions
+        self.win_patterns = self.spec.win_patterns
     
     def check_win(self, marked_positions):
         """
@@ -59,17 +29,17 @@ class GameLogic:
         Returns:
             (is_win, winning_cells): Tuple with win status and list of winning positions
         """
-        for pattern in self.win_patterns:
-            if all(pos in marked_positions for pos in pattern):
-                # Get the coordinates of the winning cells
-                winning_cells = [self.value_positions[pos] for pos in pattern]
-                return True, winning_cells
+        pattern = self.spec.winning_pattern(self.spec.mask_of(marked_positions))
+        if pattern >= 0:
+            # Get the coordinates of the winning cells
+            winning_cells = [self.value_positions[pos] for pos in self.win_patterns[pattern]]
+            return True, winning_cells
                 
         return False, []
     
     def check_draw(self, player_marks, computer_marks):
         """Check if the game is a draw (board is full)"""
-        total_cells = self.rows * self.cols
+        total_cells = self.spec.n_values
         total_marked = len(player_marks) + len(computer_marks)
         return total_marked == total_cells
     
@@ -100,40 +70,28 @@ class GameLogic:
     
     def get_potential_win_paths(self, marks):
         """
-        Find paths that are close to winning (3 in a row)
+        Find paths that are close to winning (one mark short of a win)
         
         Args:
             marks: Set of currently marked positions
             
         Returns:
-            List of tuples (pattern, missing_value) for paths with 3 marks
+            List of tuples (pattern, missing_value) for paths one mark short
         """
         potential_wins = []
+        mask = self.spec.mask_of(marks)
         
-        for pattern in self.win_patterns:
-            # Count how many positions in this pattern are marked
-            marked_count = sum(1 for pos in pattern if pos in marks)
-            
-            if marked_count == 3:
-                # Find the missing position
-                missing = next(pos for pos in pattern if pos not in marks)
-                potential_wins.append((pattern, missing))
+        for pattern, win in zip(self.win_patterns, self.spec.win_masks):
+            # A single unmarked cell left in this pattern
+            missing = win & ~mask
+            if missing and missing & (missing - 1) == 0:
+                potential_wins.append((pattern, self.spec.values[missing.bit_length() - 1]))
                 
         return potential_wins
 
 # Test the game logic if run as a script
 if __name__ == "__main__":
-    # Example board
-    board_numbers = [
-        [1, 2, 3, 4, 5, 6],
-        [7, 8, 9, 10, 12, 14],
-        [15, 16, 18, 20, 21, 24],
-        [25, 27, 28, 30, 32, 35],
-        [36, 40, 42, 45, 48, 49],
-        [54, 56, 63, 64, 72, 81]
-    ]
-    
-    game_logic = GameLogic(board_numbers)
+    game_logic = GameLogic(DEFAULT_SPEC.board_numbers)
     
     # Print all win patterns
     print(f"Total winning patterns: {len(game_logic.win_patterns)}")
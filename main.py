@@ -1,261 +1,273 @@
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Button
 import numpy as np
-import time
 # Import our game modules
 from drawboard import BoardRenderer
 from move_validation import MoveValidator
 from computer_move import ComputerPlayer
 from game_logic import GameLogic
+from board_spec import DEFAULT_SPEC
+from replay_video import ReplayRenderer, EMPTY, PLAYER, COMPUTER, HIGHLIGHT, PREVIEW, NO_HIT
 
 class MultiplicationGame:
     def __init__(self):
-        # Define the game board
-        self.board_numbers = [
-            [1, 2, 3, 4, 5, 6],
-            [7, 8, 9, 10, 12, 14],
-            [15, 16, 18, 20, 21, 24],
-            [25, 27, 28, 30, 32, 35],
-            [36, 40, 42, 45, 48, 49],
-            [54, 56, 63, 64, 72, 81]
-        ]
-       
+        # The game board and rules are shared through the board spec
+        self.spec = DEFAULT_SPEC
+        self.board_numbers = self.spec.board_numbers
+
         # Initialize game components
-        self.renderer = BoardRenderer()
-        self.validator = MoveValidator(self.board_numbers)
+        self.renderer = BoardRenderer(self.spec)
+        self.validator = MoveValidator(spec=self.spec)
         self.computer = ComputerPlayer(self.board_numbers, self.validator)
-        self.game_logic = GameLogic(self.board_numbers)
-       
+        self.game_logic = GameLogic(spec=self.spec)
+
+        # Board and selector are composited from pre-rendered cell sprites,
+        # and the sprite layout doubles as the hit map for mouse events
+        self.board_view = ReplayRenderer(self.renderer)
+
         # Game state
         self.player_marks = set()
         self.computer_marks = set()
+        self.occupied = 0  # Bitboard of marked cells
         self.current_selector = None
         self.game_over = False
         self.player_turn = True
-        self.message = "Make four in a line using multiplication."
+        self.message = f"Make {self.spec.win_length} in a line using multiplication."
         self.winning_cells = []
-       
+
+        # Preview state: what the mouse is over and the highlighted cells
+        self.hover = NO_HIT
+        self.preview_mask = 0
+        self.drawn = False  # Blitting needs one full draw first
+
         # Set computer difficulty
         self.computer.set_difficulty("normal")
-       
+
         # Setup UI
         self.setup_ui()
-   
+
     def setup_ui(self):
         """Set up the interactive UI with matplotlib"""
         self.fig = plt.figure(figsize=(12, 10), facecolor='#1E1E1E')
-       
-        # Game board area
-        self.board_ax = plt.subplot2grid((10, 10), (0, 0), colspan=7, rowspan=7)
+
+        # Game board and selector area
+        self.board_ax = plt.subplot2grid((10, 10), (0, 0), colspan=7, rowspan=8)
         self.board_ax.axis('off')
-       
-        # Selector area
-        self.selector_ax = plt.subplot2grid((10, 10), (8, 0), colspan=7, rowspan=1)
-        self.selector_ax.axis('off')
-       
+        # Shown as RGBA: matplotlib draws it without a colour conversion pass
+        self.board_rgba = np.full((self.board_view.height, self.board_view.width, 4), 255,
+                                  dtype=np.uint8)
+        self.board_rgba[..., :3] = self.board_view.frame
+        self.board_image = self.board_ax.imshow(self.board_rgba, interpolation='none')
+
         # Message area
-        self.message_ax = plt.subplot2grid((10, 10), (7, 0), colspan=7, rowspan=1)
+        self.message_ax = plt.subplot2grid((10, 10), (8, 0), colspan=7, rowspan=1)
         self.message_ax.axis('off')
-       
+
         # Game controls area
         self.controls_ax = plt.subplot2grid((10, 10), (0, 7), colspan=3, rowspan=9)
         self.controls_ax.axis('off')
-       
+
         # Add new game button
         self.new_game_button_ax = plt.subplot2grid((10, 10), (9, 3), colspan=3, rowspan=1)
         self.new_game_button = Button(self.new_game_button_ax, 'NEW GAME', color='orange')
         self.new_game_button.on_clicked(self.new_game)
-       
-        # Setup click events
+
+        # Setup mouse events
         self.fig.canvas.mpl_connect('button_press_event', self.on_click)
-       
+        self.fig.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
         # Set window title
         self.fig.canvas.manager.set_window_title('Multiplication Game')
-       
+
         # Update the UI
         self.update_ui()
-   
+
     def update_ui(self):
         """Update the game UI"""
-        # Clear axes
-        self.board_ax.clear()
-        self.selector_ax.clear()
+        # Clear the text axes
         self.message_ax.clear()
         self.controls_ax.clear()
-       
-        # Set backgrounds
-        self.board_ax.set_facecolor('#1E1E1E')
-        self.selector_ax.set_facecolor('#1E1E1E')
-        self.message_ax.set_facecolor('#1E1E1E')
-        self.controls_ax.set_facecolor('#1E1E1E')
-       
-        # Hide axes
-        self.board_ax.axis('off')
-        self.selector_ax.axis('off')
         self.message_ax.axis('off')
         self.controls_ax.axis('off')
-       
-        # Update markers
-        self.renderer.update_markers(self.player_marks, self.computer_marks)
-       
-        # Draw the game board
-        highlight_cells = []
-        if hasattr(self, 'winning_cells'):
-            highlight_cells = self.winning_cells
-           
-        board_fig = self.renderer.draw_game_board(highlight_cells)
-        self.board_ax.imshow(self._fig_to_array(board_fig))
-        plt.close(board_fig)
-       
-        # Draw the selector
-        selector_fig = self.renderer.draw_selector(self.current_selector)
-        self.selector_ax.imshow(self._fig_to_array(selector_fig))
-        plt.close(selector_fig)
-       
+
+        # Recolour the board cells whose state changed
+        self.refresh_board()
+
         # Show current message
-        self.message_ax.text(0.5, 0.5, self.message, ha='center', va='center', 
+        self.message_ax.text(0.5, 0.5, self.message, ha='center', va='center',
                            color='white', fontsize=14, fontweight='bold')
-        
+
         # Draw game controls
         self.draw_controls()
-        
+
         # Refresh the figure
         self.fig.canvas.draw_idle()
 
+    def refresh_board(self):
+        """Bring every cell sprite and the selector in line with the game state"""
+        highlight_values = {self.board_numbers[i][j] for i, j in self.winning_cells}
+        self.preview_mask = self.preview_targets()
+        for value, index in self.spec.value_index.items():
+            if value in self.player_marks:
+                state = PLAYER
+            elif value in self.computer_marks:
+                state = COMPUTER
+            elif value in highlight_values:
+                state = HIGHLIGHT
+            elif self.preview_mask >> index & 1:
+                state = PREVIEW
+            else:
+                state = EMPTY
+            self.board_view.set_cell(value, state)
+        self.board_view.set_selector(self.preview_selector())
+        self.show_board()
+
+    def show_board(self):
+        """Hand the composited frame to the board image"""
+        self.board_rgba[..., :3] = self.board_view.frame
+        self.board_image.set_data(self.board_rgba)
+
     def draw_controls(self):
         """Draw game control information"""
         controls_text = [
             "CONTROLS:",
             "",
-            "• Click on a number to select it",
-            "• Click again to confirm placement",
-            "• Make four in a line by multiplication",
+            "• Click a selector number",
+            "• Reachable products light up",
+            "• Click one of them to mark it",
+            f"• Make {self.spec.win_length} in a line to win",
             "",
-            "Player: X (Blue)",
-            "Computer: O (Red)",
+            "Player: Green",
+            "Computer: Purple",
             "",
-            "Difficulty: Normal"
+            f"Difficulty: {self.computer.difficulty.title()}"
         ]
-        
+
         for i, text in enumerate(controls_text):
-            self.controls_ax.text(0.1, 0.9 - i * 0.08, text, color='white', 
+            self.controls_ax.text(0.1, 0.9 - i * 0.08, text, color='white',
                                 fontsize=11, fontweight='bold' if i == 0 else 'normal')
 
-    def _fig_to_array(self, fig):
-        """Convert matplotlib figure to array for display"""
-        fig.canvas.draw()
-        data = np.frombuffer(fig.canvas.tostring_rgb(), dtype=np.uint8)
-        data = data.reshape(fig.canvas.get_width_height()[::-1] + (3,))
-        return data
+    # Hover preview
+
+    def preview_selector(self):
+        """Selector to preview: the hovered slot, else the chosen selector"""
+        if self.hover >= self.spec.n_cells:
+            return self.spec.selectors[self.hover - self.spec.n_cells]
+        return self.current_selector
+
+    def preview_targets(self):
+        """Mask of the empty cells the previewed selector can reach"""
+        selector = self.preview_selector()
+        if selector is None or self.game_over or not self.player_turn:
+            return 0
+        return self.spec.selector_targets[selector] & ~self.occupied
+
+    def on_draw(self, event):
+        self.drawn = True
+
+    def on_motion(self, event):
+        """Update the preview as the mouse moves; does nothing unless the hit changes"""
+        hit = NO_HIT
+        if event.inaxes is self.board_ax and event.xdata is not None:
+            hit = self.board_view.hit_test(event.xdata, event.ydata)
+        if hit == self.hover:
+            return
+        self.hover = hit
+        self.update_preview()
+
+    def update_preview(self):
+        """Recolour only the cells entering or leaving the preview, then blit the board"""
+        mask = self.preview_targets()
+        changed = mask ^ self.preview_mask
+        self.preview_mask = mask
+        values = self.spec.values
+        while changed:
+            low = changed & -changed
+            changed ^= low
+            # Marked cells never enter the preview, so a cell leaving it is empty
+            self.board_view.set_cell(values[low.bit_length() - 1],
+                                     PREVIEW if mask & low else EMPTY)
+        self.board_view.set_selector(self.preview_selector())
+        self.show_board()
+
+        canvas = self.fig.canvas
+        if canvas.supports_blit and self.drawn:
+            self.board_ax.draw_artist(self.board_image)
+            canvas.blit(self.board_ax.bbox)
+        else:
+            canvas.draw_idle()
+
+    # Clicks
 
     def on_click(self, event):
         """Handle click events"""
-        if self.game_over:
+        if self.game_over or event.inaxes is not self.board_ax or event.xdata is None:
+            return
+
+        hit = self.board_view.hit_test(event.xdata, event.ydata)
+        if hit >= self.spec.n_cells:
+            self.handle_selector_click(self.spec.selectors[hit - self.spec.n_cells])
+        elif hit != NO_HIT:
+            self.handle_board_click(hit)
+
+    def handle_selector_click(self, selector):
+        """Choose a selector, or drop it when it is clicked again"""
+        if not self.player_turn:
             return
-            
-        if event.inaxes == self.board_ax:
-            # Convert click position to board cell
-            x, y = event.xdata, event.ydata
-            board_width, board_height = self.board_ax.get_xlim()[1], self.board_ax.get_ylim()[0]
-            col = int(x / (board_width / 6))
-            row = int(y / (board_height / 6))
-            
-            if 0 <= row < 6 and 0 <= col < 6:
-                self.handle_board_click(row, col)
-                
-        elif event.inaxes == self.selector_ax and self.current_selector is not None:
-            # Handle selector click
-            x = event.xdata
-            selector_width = self.selector_ax.get_xlim()[1]
-            selected_option = int(x / (selector_width / 2))
-            
-            if selected_option == 0:  # Confirm
-                self.confirm_selection()
-            else:  # Cancel
-                self.cancel_selection()
-
-    def handle_board_click(self, row, col):
+        if selector == self.current_selector:
+            self.cancel_selection()
+            return
+        self.current_selector = selector
+        self.message = f"Selected {selector}. Click a highlighted product."
+        self.update_ui()
+
+    def handle_board_click(self, index):
         """Handle a click on the game board"""
         if not self.player_turn:
             self.message = "Wait for the computer's move!"
             self.update_ui()
             return
-            
-        clicked_number = self.board_numbers[row][col]
-        cell_position = (row, col)
-        
-        # Check if the cell is already marked
-        if cell_position in self.player_marks or cell_position in self.computer_marks:
+
+        clicked_number = self.spec.values[index]
+        if self.occupied >> index & 1:
             self.message = "That cell is already taken!"
             self.update_ui()
             return
-            
-        # If no current selection, make this the selection
         if self.current_selector is None:
-            self.current_selector = {
-                "number": clicked_number,
-                "position": cell_position
-            }
-            self.message = f"Selected {clicked_number}. Confirm or cancel?"
+            self.message = "Choose a selector number first."
+            self.update_ui()
+            return
+        if not self.spec.selector_targets[self.current_selector] >> index & 1:
+            self.message = f"{clicked_number} is not a multiple of {self.current_selector} on the board!"
             self.update_ui()
-        else:
-            # Check if this forms a valid multiplication with the current selection
-            selected_number = self.current_selector["number"]
-            selected_position = self.current_selector["position"]
-            
-            if self.validator.is_valid_move(selected_position, cell_position):
-                # Mark both cells
-                self.player_marks.add(selected_position)
-                self.player_marks.add(cell_position)
-                
-                # Check for win
-                winning_line = self.game_logic.check_win(self.player_marks)
-                if winning_line:
-                    self.winning_cells = winning_line
-                    self.game_over = True
-                    self.message = "You win! Congratulations!"
-                    self.update_ui()
-                    return
-                    
-                # Computer's turn
-                self.current_selector = None
-                self.message = "Computer is thinking..."
-                self.update_ui()
-                
-                # Add a small delay to simulate computer thinking
-                self.fig.canvas.start_event_loop(0.8)
-                
-                # Make computer move
-                self.make_computer_move()
-            else:
-                self.message = f"{selected_number} × {clicked_number} is not a valid move!"
-                self.update_ui()
-
-    def confirm_selection(self):
-        """Confirm the current selection"""
-        if self.current_selector is None:
             return
-            
-        position = self.current_selector["position"]
-        self.player_marks.add(position)
+
+        self.place(self.player_marks, clicked_number)
         self.current_selector = None
-        
+
         # Check for win
-        winning_line = self.game_logic.check_win(self.player_marks)
-        if winning_line:
+        is_win, winning_line = self.game_logic.check_win(self.player_marks)
+        if is_win:
             self.winning_cells = winning_line
             self.game_over = True
             self.message = "You win! Congratulations!"
             self.update_ui()
             return
-            
+        if self.game_logic.check_draw(self.player_marks, self.computer_marks):
+            self.game_over = True
+            self.message = "Game over! It's a draw."
+            self.update_ui()
+            return
+
         # Computer's turn
+        self.player_turn = False
         self.message = "Computer is thinking..."
         self.update_ui()
-        
+
         # Add a small delay to simulate computer thinking
         self.fig.canvas.start_event_loop(0.8)
-        
+
         # Make computer move
         self.make_computer_move()
 
@@ -265,47 +277,42 @@ class MultiplicationGame:
         self.message = "Selection canceled. Choose a number."
         self.update_ui()
 
+    def place(self, marks, value):
+        """Mark a board value for one side"""
+        marks.add(value)
+        self.occupied |= self.spec.value_bits[value]
+
     def make_computer_move(self):
         """Handle the computer's move"""
         self.player_turn = False
-        
+
         # Get computer move
-        move = self.computer.make_move(self.player_marks, self.computer_marks)
-        
-        if move:
-            # Unpack the move (might be a single cell or a pair)
-            if len(move) == 1:
-                self.computer_marks.add(move[0])
-                row, col = move[0]
-                number = self.board_numbers[row][col]
-                self.message = f"Computer placed at {number}."
-            else:
-                self.computer_marks.add(move[0])
-                self.computer_marks.add(move[1])
-                row1, col1 = move[0]
-                row2, col2 = move[1]
-                num1 = self.board_numbers[row1][col1]
-                num2 = self.board_numbers[row2][col2]
-                self.message = f"Computer placed at {num1} and {num2}."
-            
+        selector = self.computer.choose_selector_number(self.player_marks, self.computer_marks)
+        move = self.computer.choose_move(selector, self.player_marks, self.computer_marks,
+                                         self.game_logic)
+
+        if move is not None:
+            self.place(self.computer_marks, move)
+            self.message = f"Computer chose {selector} and placed at {move}."
+
             # Check for win
-            winning_line = self.game_logic.check_win(self.computer_marks)
-            if winning_line:
+            is_win, winning_line = self.game_logic.check_win(self.computer_marks)
+            if is_win:
                 self.winning_cells = winning_line
                 self.game_over = True
                 self.message = "Computer wins! Better luck next time."
                 self.update_ui()
                 return
-                
+
             # Check for draw
-            if len(self.player_marks) + len(self.computer_marks) == 36:
+            if self.game_logic.check_draw(self.player_marks, self.computer_marks):
                 self.game_over = True
                 self.message = "Game over! It's a draw."
                 self.update_ui()
                 return
         else:
             self.message = "Computer couldn't find a move! Your turn."
-        
+
         self.player_turn = True
         self.update_ui()
 
@@ -313,18 +320,18 @@ class MultiplicationGame:
         """Start a new game"""
         self.player_marks = set()
         self.computer_marks = set()
+        self.occupied = 0
         self.current_selector = None
         self.game_over = False
         self.player_turn = True
-        self.message = "New game! Make four in a line using multiplication."
+        self.message = f"New game! Make {self.spec.win_length} in a line using multiplication."
         self.winning_cells = []
         self.update_ui()
 
 def main():
     """Main function to start the game"""
     game = MultiplicationGame()
-    plt.tight_layout()
     plt.show()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
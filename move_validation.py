@@ -1,16 +1,16 @@
+from board_spec import spec_for_board, DEFAULT_SPEC
+
 class MoveValidator:
-    def __init__(self, board_numbers):
-        self.board_numbers = board_numbers
-        self.board_values = {}
+    def __init__(self, board_numbers=None, spec=None):
+        self.spec = spec or spec_for_board(board_numbers)
+        self.board_numbers = self.spec.board_numbers
         
-        # Create a dictionary mapping values to their board positions
-        for i in range(len(board_numbers)):
-            for j in range(len(board_numbers[i])):
-                self.board_values[board_numbers[i][j]] = (i, j)
+        # Dictionary mapping values to their board positions
+        self.board_values = self.spec.value_positions
     
     def is_valid_selection(self, number):
-        """Check if the selected number (1-9) is valid"""
-        return 1 <= number <= 9
+        """Check if the selected number is on the selector"""
+        return number in self.spec.selectors
     
     def get_product(self, selector_num, board_num):
         """Calculate the product of the selector number and a board number"""
@@ -18,20 +18,17 @@ class MoveValidator:
     
     def find_products_on_board(self, selector_num):
         """Find all products on the board that can be made with the selected number"""
-        products = []
-        for row in self.board_numbers:
-            for num in row:
-                product = selector_num * num
-                if product in self.board_values:
-                    products.append((num, product))
-        return products
+        products = self.spec.products.get(selector_num)
+        if products is None:
+            products = self.spec.find_products(selector_num)
+        return list(products)
     
     def is_valid_move(self, selector_num, target_value, player_marks, computer_marks):
         """
         Check if placing a marker on target_value using the selector_num is valid
         
         Args:
-            selector_num: Number selected from the selector (1-9)
+            selector_num: Number selected from the selector
             target_value: Value on the board to place a marker on
             player_marks: Set of values already marked by the player
             computer_marks: Set of values already marked by the computer
@@ -69,17 +66,7 @@ class MoveValidator:
 
 # Test the move validator if run as a script
 if __name__ == "__main__":
-    # Example board from the game
-    board_numbers = [
-        [1, 2, 3, 4, 5, 6],
-        [7, 8, 9, 10, 12, 14],
-        [15, 16, 18, 20, 21, 24],
-        [25, 27, 28, 30, 32, 35],
-        [36, 40, 42, 45, 48, 49],
-        [54, 56, 63, 64, 72, 81]
-    ]
-    
-    validator = MoveValidator(board_numbers)
+    validator = MoveValidator(DEFAULT_SPEC.board_numbers)
     
     # Test finding products
     print("Products using 3 as selector:")
@@ -0,0 +1,364 @@
+import json
+import os
+import struct
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai_cache import position_key
+from board_spec import DEFAULT_SPEC
+from computer_move import ComputerPlayer
+from move_validation import MoveValidator
+from search import Searcher, MATE_SCORE
+from shared_tables import attach_spec, shared_spec_tables
+from threat_search import ThreatSolver
+
+MAGIC = b"MGPZ"
+VERSION = 1
+
+# Per-worker miner, built once by _init_worker
+_miner = None
+
+
+class Puzzle:
+    def __init__(self, key, own, opp, line):
+        """
+        A "win in N" puzzle: the side to move (own) has a forced win
+
+        Args:
+            key: Position hash, as used by the evaluation cache
+            own: Mask of the side to move
+            opp: Mask of the opponent
+            line: Solution as cell indexes, attacker first
+        """
+        self.key = key
+        self.own = own
+        self.opp = opp
+        self.line = line
+
+    @property
+    def depth(self):
+        """N in "win in N": attacker moves including the winning one"""
+        return (len(self.line) + 1) // 2
+
+    def to_record(self, spec):
+        """Pack into a compact binary record"""
+        size = (spec.n_cells + 7) // 8
+        return (struct.pack("<qB", self.key, len(self.line)) +
+                self.own.to_bytes(size, "little") + self.opp.to_bytes(size, "little") +
+                bytes(self.line))
+
+    def solution_values(self, spec):
+        return [spec.values[k] for k in self.line]
+
+
+def write_header(f, spec):
+    f.write(MAGIC + bytes([VERSION]) + spec.fingerprint.encode())
+
+
+def read_puzzles(path, spec=None):
+    """
+    Stream puzzles from a file written by the miner
+
+    A record cut short at the end of the file (a crash while appending) is
+    ignored.
+
+    Yields:
+        Puzzle objects
+    """
+    for puzzle, _ in _read_records(path, spec):
+        yield puzzle
+
+
+def _read_records(path, spec=None):
+    """Yield (puzzle, file offset just past its record) for every whole record"""
+    spec = spec or DEFAULT_SPEC
+    size = (spec.n_cells + 7) // 8
+    with open(path, "rb") as f:
+        header = f.read(len(MAGIC) + 1 + len(spec.fingerprint))
+        if header[:4] != MAGIC or header[5:].decode() != spec.fingerprint:
+            raise ValueError(f"{path} is not a puzzle file for this board")
+        fixed = struct.calcsize("<qB")
+        while True:
+            head = f.read(fixed)
+            if len(head) < fixed:
+                return
+            key, n = struct.unpack("<qB", head)
+            body = f.read(2 * size + n)
+            if len(body) < 2 * size + n:
+                return  # Partial tail
+            own = int.from_bytes(body[:size], "little")
+            opp = int.from_bytes(body[size:2 * size], "little")
+            yield Puzzle(key, own, opp, list(body[2 * size:])), f.tell()
+
+
+class PuzzleMiner:
+    def __init__(self, spec=None, min_depth=2, max_depth=6, min_plies=6,
+                 difficulty="normal", verify_nodes=20000):
+        """
+        Generate and verify forced-win puzzles from self-play
+
+        Candidate positions come from games between two ComputerPlayers.
+        The ThreatSolver proves a forced win; the solution must be the only
+        winning first move: alternative threats are re-solved, then every
+        alternative is checked by a full-width search within a node budget
+        (positions whose check runs out of budget are rejected).
+
+        Args:
+            spec: BoardSpec of the game (defaults to the standard game)
+            min_depth: Smallest N for "win in N" puzzles
+            max_depth: Largest N
+            min_plies: Skip the opening plies of each game
+            difficulty: Difficulty of the self-play players
+            verify_nodes: Node budget for each uniqueness check
+        """
+        self.spec = spec or DEFAULT_SPEC
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.min_plies = min_plies
+        self.verify_nodes = verify_nodes
+        self.validator = MoveValidator(spec=self.spec)
+        self.computer = ComputerPlayer(self.spec.board_numbers, self.validator)
+        self.computer.set_difficulty(difficulty)
+        self.solver = ThreatSolver(self.spec, self.validator)
+        self.searcher = Searcher(self.spec)
+
+    def candidates(self, seed):
+        """Positions (side to move first) from one seeded self-play game"""
+        self.computer.seed(seed)
+        marks = [set(), set()]
+        side = 0
+        for ply in range(self.spec.n_values):
+            own, opp = marks[side], marks[1 - side]
+            if ply >= self.min_plies:
+                yield self.spec.mask_of(own), self.spec.mask_of(opp)
+            selector = self.computer.choose_selector_number(opp, own)
+            move = self.computer.choose_move(selector, opp, own)
+            if move is None:
+                return
+            own.add(move)
+            if self.spec.completes_win(self.spec.mask_of(own), self.spec.value_index[move]):
+                return
+            side = 1 - side
+
+    def verify(self, own, opp):
+        """
+        Return a Puzzle if the position is a forced win with a unique first move
+
+        Returns:
+            (Puzzle or None, reason)
+        """
+        spec = self.spec
+        if self.solver.threats(own, opp) or self.solver.threats(opp, own):
+            return None, "trivial"  # Win in 1 or an opponent threat to answer
+        forced = self.solver.solve(own, opp, self.max_depth)
+        if forced is None:
+            return None, "no_win"
+        if forced.depth < self.min_depth:
+            return None, "too_short"
+
+        first = spec.value_index[forced.first_move]
+        n = forced.depth
+        free = self.solver.reachable & ~(own | opp) & ~(1 << first)
+        while free:
+            low = free & -free
+            free ^= low
+            attacker = own | low
+            threats = self.solver.threats(attacker, opp)
+            if threats & (threats - 1):
+                return None, "not_unique"
+            if threats:
+                if self.solver.solve(attacker, opp | threats, n - 1) is not None:
+                    return None, "not_unique"
+                # The block is forced, but the attacker may go on with a quiet move
+                # that the threat solver does not see
+                if n > 1:
+                    result = self.searcher.search(attacker, opp | threats, depth=2 * n - 3,
+                                                  node_limit=self.verify_nodes)
+                    if result.depth < 2 * n - 3 and result.score < MATE_SCORE:
+                        return None, "unverified"
+                    if result.score >= MATE_SCORE:
+                        return None, "not_unique"
+                continue
+            # Quiet move: the opponent is free to reply, needs a full-width check
+            if n > 1:
+                result = self.searcher.search(opp, attacker, depth=2 * n - 2,
+                                              node_limit=self.verify_nodes)
+                if result.depth < 2 * n - 2 and result.score > -MATE_SCORE:
+                    return None, "unverified"
+                if result.score <= -MATE_SCORE:
+                    return None, "not_unique"
+
+        line = [spec.value_index[value] for value in forced.line]
+        return Puzzle(position_key(spec, own, opp), own, opp, line), "ok"
+
+    def mine(self, seeds):
+        """Mine the games for a list of seeds; returns (puzzles, reasons)"""
+        puzzles = []
+        reasons = Counter()
+        seen = set()
+        for seed in seeds:
+            for own, opp in self.candidates(seed):
+                if (own, opp) in seen:
+                    continue
+                seen.add((own, opp))
+                puzzle, reason = self.verify(own, opp)
+                reasons[reason] += 1
+                if puzzle is not None:
+                    puzzles.append(puzzle)
+        return puzzles, reasons
+
+
+def _init_worker(options, tables=None):
+    """Build this worker's miner; the spec comes from shared tables when named"""
+    global _miner
+    if tables is not None:
+        options = dict(options, spec=attach_spec(tables))
+    _miner = PuzzleMiner(**options)
+
+
+def _mine_batch(seeds):
+    return seeds[0], _miner.mine(seeds)
+
+
+class MiningRun:
+    def __init__(self, out_path, checkpoint_path=None, spec=None, **options):
+        """
+        Parallel, resumable puzzle mining into a compact binary file
+
+        Args:
+            out_path: Puzzle file; appended to when resuming
+            checkpoint_path: JSON checkpoint (defaults to out_path + ".ckpt")
+            spec: BoardSpec of the game
+            options: Passed on to PuzzleMiner
+        """
+        self.spec = spec or DEFAULT_SPEC
+        self.out_path = out_path
+        self.checkpoint_path = checkpoint_path or out_path + ".ckpt"
+        self.options = options
+        self.seen = set()
+        self.depths = Counter()
+        self.reasons = Counter()
+        self.next_seed = 0
+        self.elapsed = 0.0
+        self._load()
+
+    def _load(self):
+        """Resume from the checkpoint and rebuild the dedup set from the file"""
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+            self.next_seed = state["next_seed"]
+            self.elapsed = state["elapsed"]
+            self.reasons.update(state["reasons"])
+        if os.path.exists(self.out_path):
+            end = len(MAGIC) + 1 + len(self.spec.fingerprint)
+            for puzzle, end in _read_records(self.out_path, self.spec):
+                self.seen.add(puzzle.key)
+                self.depths[puzzle.depth] += 1
+            if os.path.getsize(self.out_path) > end:
+                # Drop a record cut short by a crash, so appends stay aligned
+                with open(self.out_path, "r+b") as f:
+                    f.truncate(end)
+        else:
+            with open(self.out_path, "wb") as f:
+                write_header(f, self.spec)
+
+    def _save_checkpoint(self):
+        state = {"next_seed": self.next_seed, "elapsed": self.elapsed,
+                 "reasons": dict(self.reasons), "puzzles": len(self.seen)}
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def run(self, games, workers=None, games_per_task=4):
+        """
+        Mine games [next_seed, next_seed + games)
+
+        Results are appended and the checkpoint advanced as batches finish;
+        the checkpoint only moves past batches whose results are on disk.
+
+        Returns:
+            Number of new puzzles written
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        first = self.next_seed
+        batches = [list(range(s, min(s + games_per_task, first + games)))
+                   for s in range(first, first + games, games_per_task)]
+        done = set()
+        new = 0
+        start = time.perf_counter()
+        base_elapsed = self.elapsed
+
+        def record(batch_start, puzzles, reasons):
+            nonlocal new
+            with open(self.out_path, "ab") as f:
+                for puzzle in puzzles:
+                    if puzzle.key in self.seen:
+                        self.reasons["duplicate"] += 1
+                        continue
+                    self.seen.add(puzzle.key)
+                    self.depths[puzzle.depth] += 1
+                    f.write(puzzle.to_record(self.spec))
+                    new += 1
+            self.reasons.update(reasons)
+            done.add(batch_start)
+            while self.next_seed in done:
+                done.discard(self.next_seed)
+                self.next_seed = min(self.next_seed + games_per_task, first + games)
+            self.elapsed = base_elapsed + time.perf_counter() - start
+            self._save_checkpoint()
+
+        if workers <= 1:
+            _init_worker(dict(self.options, spec=self.spec))
+            for batch in batches:
+                batch_start, (puzzles, reasons) = _mine_batch(batch)
+                record(batch_start, puzzles, reasons)
+        else:
+            # Workers attach to the published spec tables instead of rebuilding them
+            with shared_spec_tables(self.spec) as tables, \
+                    ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(self.options, tables)) as pool:
+                futures = [pool.submit(_mine_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    batch_start, (puzzles, reasons) = future.result()
+                    record(batch_start, puzzles, reasons)
+        return new
+
+    @property
+    def puzzles_per_hour(self):
+        return len(self.seen) / self.elapsed * 3600 if self.elapsed > 0 else 0.0
+
+    def report(self):
+        lines = [f"{len(self.seen)} puzzles from {self.next_seed} games in {self.elapsed:.1f}s "
+                 f"({self.puzzles_per_hour:,.0f} verified puzzles/hour)",
+                 "Depth distribution: " + ", ".join(
+                     f"win in {d}: {c}" for d, c in sorted(self.depths.items())),
+                 "Candidates: " + ", ".join(f"{r}: {c}" for r, c in sorted(self.reasons.items()))]
+        return "\n".join(lines)
+
+
+# Mine puzzles from the command line
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mine forced-win puzzles from self-play")
+    parser.add_argument("--games", type=int, default=40, help="Self-play games to mine")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--out", default="puzzles.bin", help="Puzzle file")
+    parser.add_argument("--min-depth", type=int, default=2, help="Shortest win in N")
+    parser.add_argument("--max-depth", type=int, default=6, help="Longest win in N")
+    args = parser.parse_args()
+
+    run = MiningRun(args.out, min_depth=args.min_depth, max_depth=args.max_depth)
+    new = run.run(args.games, args.workers)
+    print(f"Wrote {new} new puzzles to {args.out}")
+    print(run.report())
+
+    for puzzle in read_puzzles(args.out):
+        print(f"Example: to move {DEFAULT_SPEC.values_of(puzzle.own)}, "
+              f"opponent {DEFAULT_SPEC.values_of(puzzle.opp)}, "
+              f"win in {puzzle.depth}: {puzzle.solution_values(DEFAULT_SPEC)}")
+        break
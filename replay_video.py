@@ -0,0 +1,296 @@
+import os
+import subprocess
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgb
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+from drawboard import BoardRenderer
+from game_logic import GameLogic
+
+# Sprite states for a board cell
+EMPTY, PLAYER, COMPUTER, HIGHLIGHT, PREVIEW = range(5)
+
+# Hit map code for pixels outside every cell and selector slot
+NO_HIT = -1
+
+
+class ReplayRenderer:
+    def __init__(self, renderer=None, cell_size=64, dpi=100):
+        """
+        Composite replay frames from pre-rendered cell sprites
+
+        Every cell is rasterised once per state (empty, player, computer,
+        highlighted, previewed) and every selector slot once plain and once
+        highlighted.
+        Frames are then built by copying sprites into a frame buffer, and only
+        cells whose state changed are copied again.
+
+        Args:
+            renderer: Optional BoardRenderer providing the board and colours
+            cell_size: Width and height of a board cell in pixels
+            dpi: Resolution used when rasterising the sprites
+        """
+        self.renderer = renderer or BoardRenderer()
+        self.spec = self.renderer.spec
+        self.board_numbers = self.spec.board_numbers
+        self.selectors = self.spec.selectors
+        self.rows = self.spec.rows
+        self.cols = self.spec.cols
+        self.cell_size = cell_size
+        self.dpi = dpi
+        self.cell_index = self.spec.value_index
+
+        # Sprite sheets: state -> (rows*cs, cols*cs, 3) image of the whole board
+        state_colors = [self.renderer.cell_color, self.renderer.player_color,
+                        self.renderer.computer_color, self.renderer.highlight_color,
+                        self.renderer.preview_color]
+        self.selector_size = self.cols * cell_size // len(self.selectors)
+        self.cell_sprites = [self._rasterise_grid(self.board_numbers, cell_size, color)
+                             for color in state_colors]
+        self.selector_sprites = [self._rasterise_grid([self.selectors], self.selector_size, color)
+                                 for color in (self.renderer.cell_color,
+                                               self.renderer.highlight_color)]
+
+        # Frame layout: board on top, a half-cell gap, then the selector strip
+        self.width = max(self.cols * cell_size, len(self.selectors) * self.selector_size)
+        self.board_height = self.rows * cell_size
+        self.selector_top = self.board_height + cell_size // 2
+        self.height = self.selector_top + self.selector_size
+
+        background = (np.array(to_rgb(self.renderer.background_color)) * 255).round()
+        self.frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.frame[:] = background.astype(np.uint8)
+        self.cell_states = np.full(self.rows * self.cols, -1, dtype=np.int8)
+        self.selected = None
+        self.hit_map = self._build_hit_map()
+        self.reset()
+
+    def _build_hit_map(self):
+        """
+        Frame-sized map from pixel to what is drawn there
+
+        Board cells map to their cell index, selector slot k maps to
+        n_cells + k, and everything else (gaps, holes) to NO_HIT.
+        """
+        hit_map = np.full((self.height, self.width), NO_HIT, dtype=np.int16)
+        for value, index in self.cell_index.items():
+            hit_map[self._cell_slice(index)] = index
+        top = self.selector_top
+        for k, number in enumerate(self.selectors):
+            hit_map[top:top + self.selector_size, self._selector_slice(number)] = \
+                self.spec.n_cells + k
+        return hit_map
+
+    def hit_test(self, x, y):
+        """Hit map code under frame pixel coordinates (as in imshow data coordinates)"""
+        row, col = int(y + 0.5), int(x + 0.5)
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return int(self.hit_map[row, col])
+        return NO_HIT
+
+    def _rasterise_grid(self, numbers, size, color):
+        """Draw a grid of numbered cells in one colour and return its pixels"""
+        rows, cols = len(numbers), len(numbers[0])
+        fig = Figure(figsize=(cols * size / self.dpi, rows * size / self.dpi), dpi=self.dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_xlim(0, cols)
+        ax.set_ylim(rows, 0)
+        ax.axis('off')
+
+        fontsize = size * 0.3 * 72 / self.dpi
+        for i in range(rows):
+            for j in range(cols):
+                if numbers[i][j] is None:  # Holes stay background
+                    continue
+                ax.add_patch(Rectangle((j, i), 1, 1, facecolor=color,
+                                       edgecolor='black', linewidth=1))
+                ax.text(j + 0.5, i + 0.5, str(numbers[i][j]), ha='center', va='center',
+                        fontsize=fontsize, weight='bold', color=self.renderer.text_color)
+
+        canvas.draw()
+        pixels = np.asarray(canvas.buffer_rgba())[..., :3].copy()
+        return pixels[:rows * size, :cols * size]
+
+    def _cell_slice(self, index):
+        i, j = divmod(index, self.cols)
+        cs = self.cell_size
+        return slice(i * cs, (i + 1) * cs), slice(j * cs, (j + 1) * cs)
+
+    def _selector_slice(self, number):
+        k = self.selectors.index(number)
+        ss = self.selector_size
+        return slice(k * ss, (k + 1) * ss)
+
+    def set_cell(self, value, state):
+        """Blit the sprite for one cell if its state changed"""
+        index = self.cell_index[value]
+        if self.cell_states[index] == state:
+            return
+        self.cell_states[index] = state
+        rows, cols = self._cell_slice(index)
+        self.frame[rows, cols] = self.cell_sprites[state][rows, cols]
+
+    def set_selector(self, number):
+        """Move the selector highlight, blitting only the slots that change"""
+        if number == self.selected:
+            return
+        top = self.selector_top
+        bottom = top + self.selector_size
+        for slot, sprite in ((self.selected, 0), (number, 1)):
+            if slot is not None:
+                cols = self._selector_slice(slot)
+                self.frame[top:bottom, cols] = self.selector_sprites[sprite][:, cols]
+        self.selected = number
+
+    def reset(self):
+        """Show an empty board with no selector highlighted"""
+        for value in self.cell_index:
+            self.set_cell(value, EMPTY)
+        top = self.selector_top
+        self.frame[top:top + self.selector_size, :self.selector_sprites[0].shape[1]] = \
+            self.selector_sprites[0]
+        self.selected = None
+
+    def show_state(self, player_marks, computer_marks, highlight_cells=(), selector=None):
+        """Update the frame to an arbitrary position"""
+        highlight_values = {self.board_numbers[i][j] for i, j in highlight_cells}
+        for value in self.cell_index:
+            if value in player_marks:
+                state = PLAYER
+            elif value in computer_marks:
+                state = COMPUTER
+            elif value in highlight_values:
+                state = HIGHLIGHT
+            else:
+                state = EMPTY
+            self.set_cell(value, state)
+        self.set_selector(selector)
+        return self.frame
+
+    def replay(self, record, frames_per_move=1, final_frames=1):
+        """
+        Generate the frames of an archived game
+
+        The same frame buffer is yielded every time; copy it if frames need
+        to be kept.
+
+        Args:
+            record: Dict with "moves" (list of [selector, value]) and "first"
+                    ("player" or "computer"), as written by game_analytics
+            frames_per_move: Number of frames to hold each move for
+            final_frames: Number of frames showing the winning line
+
+        Yields:
+            (height, width, 3) uint8 frame
+        """
+        game_logic = GameLogic(spec=self.spec)
+        side = PLAYER if record.get("first", "player") == "player" else COMPUTER
+        marks = {PLAYER: set(), COMPUTER: set()}
+        self.reset()
+        for _ in range(frames_per_move):
+            yield self.frame
+
+        for selector, value in record.get("moves", []):
+            marks[side].add(value)
+            self.set_selector(selector)
+            self.set_cell(value, side)
+            for _ in range(frames_per_move):
+                yield self.frame
+            side = COMPUTER if side == PLAYER else PLAYER
+
+        for owner in (PLAYER, COMPUTER):
+            is_win, winning_cells = game_logic.check_win(marks[owner])
+            if is_win:
+                for i, j in winning_cells:
+                    self.set_cell(self.board_numbers[i][j], HIGHLIGHT)
+                break
+        for _ in range(final_frames):
+            yield self.frame
+
+
+def write_image_sequence(frames, out_dir, prefix="frame"):
+    """
+    Write frames as numbered PNG files
+
+    Returns:
+        Number of frames written
+    """
+    from matplotlib.image import imsave
+
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for count, frame in enumerate(frames, 1):
+        imsave(os.path.join(out_dir, f"{prefix}_{count:05d}.png"), frame)
+    return count
+
+
+def write_raw_video(frames, stream):
+    """
+    Write frames as raw RGB24 bytes to a binary stream, such as a video pipe
+
+    Returns:
+        Number of frames written
+    """
+    count = 0
+    for count, frame in enumerate(frames, 1):
+        stream.write(memoryview(frame).cast("B"))
+    return count
+
+
+def ffmpeg_command(width, height, filename, fps=4):
+    """Command line for an ffmpeg process that encodes raw frames from stdin"""
+    return ["ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+            "-r", str(fps), "-i", "-",
+            "-pix_fmt", "yuv420p", filename]
+
+
+def export_replay_video(record, filename, fps=4, renderer=None, cell_size=64):
+    """
+    Encode an archived game to a video file through an ffmpeg pipe
+
+    Returns:
+        Number of frames written
+    """
+    replay = ReplayRenderer(renderer, cell_size)
+    # yuv420p needs even dimensions
+    width, height = replay.width - replay.width % 2, replay.height - replay.height % 2
+    command = ffmpeg_command(width, height, filename, fps)
+    with subprocess.Popen(command, stdin=subprocess.PIPE) as process:
+        frames = (np.ascontiguousarray(f[:height, :width])
+                  for f in replay.replay(record, final_frames=fps))
+        count = write_raw_video(frames, process.stdin)
+        process.stdin.close()
+    if process.returncode:
+        raise RuntimeError(f"ffmpeg exited with status {process.returncode}")
+    return count
+
+
+# Time frame composition if run as a script
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    start = time.perf_counter()
+    replay = ReplayRenderer()
+    print(f"Sprites rasterised in {time.perf_counter() - start:.2f}s "
+          f"({replay.width}x{replay.height} frames)")
+
+    record = {"first": "player",
+              "moves": [[3, 9], [2, 4], [4, 16], [5, 10], [7, 28], [3, 21], [5, 45]]}
+
+    start = time.perf_counter()
+    n_frames = 0
+    for _ in range(1000):
+        for _ in replay.replay(record):
+            n_frames += 1
+    elapsed = time.perf_counter() - start
+    print(f"Composited {n_frames} frames, {elapsed / n_frames * 1e6:.1f} µs per frame")
+
+    out_dir = tempfile.mkdtemp()
+    count = write_image_sequence(replay.replay(record), out_dir)
+    print(f"Wrote {count} frames to {out_dir}")
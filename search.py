@@ -0,0 +1,322 @@
+import time
+
+from board_spec import DEFAULT_SPEC
+
+# Scores are from the point of view of the side to move. A win found at ply
+# p scores WIN_SCORE - p, so anything beyond MATE_SCORE is a forced result.
+WIN_SCORE = 1000000
+MATE_SCORE = WIN_SCORE - 1000
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Learned evaluations in [-1, 1] are scaled to integer scores by this factor
+EVAL_SCALE = 10000
+
+# Static score worth a learned evaluation of 1: with the default weights the
+# spread of learned scores is about 200 times that of static scores
+EVAL_STATIC_EQUIVALENT = 50
+
+# Share of the time and node budget the threat-space pre-pass may use
+THREAT_SHARE = 0.25
+
+# Weight of a win pattern holding k marks of one side and none of the other
+PATTERN_WEIGHTS = (0, 1, 4, 16, 64, 256, 1024, 4096)
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+
+
+class SearchResult:
+    def __init__(self, move, score, depth, nodes, pv, elapsed):
+        """
+        Result of a search
+
+        Args:
+            move: Best board value to mark, or None if there is no legal move
+            score: Score of the position for the side to move
+            depth: Deepest fully completed iteration
+            nodes: Number of positions visited
+            pv: Principal variation as a list of board values
+            elapsed: Search time in seconds
+        """
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.pv = pv
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (f"SearchResult(move={self.move}, score={self.score}, depth={self.depth}, "
+                f"nodes={self.nodes}, pv={self.pv})")
+
+
+class Searcher:
+    def __init__(self, spec=None, cache=None, cache_min_depth=3, max_table_entries=1000000,
+                 evaluator=None, threat_solver=None):
+        """
+        Alpha-beta search over bitboard positions
+
+        A position is a pair of masks (own, opp) from the point of view of the
+        side to move. A move marks any empty cell that some selector can reach
+        under MoveValidator's rules.
+
+        Args:
+            spec: BoardSpec of the game (defaults to the standard game)
+            cache: Optional EvalCache that persists results between runs
+            cache_min_depth: Only results searched at least this deep are
+                             looked up in and written to the persistent cache
+            max_table_entries: The in-memory table is cleared when it grows past this
+            evaluator: Optional learned Evaluator used at the search horizon
+                       instead of the static pattern count
+            threat_solver: Optional ThreatSolver run before the full-width
+                           search; a forced win it finds is played at once
+        """
+        self.spec = spec or DEFAULT_SPEC
+        self.cache = cache
+        self.cache_min_depth = cache_min_depth
+        self.evaluator = evaluator
+        self.threat_solver = threat_solver
+        self.table = {}
+        self.max_table_entries = max_table_entries
+
+        # Static move ordering: cells on more win patterns first
+        self.cell_order = sorted(range(self.spec.n_cells),
+                                 key=lambda k: -len(self.spec.cell_patterns[k]))
+        self.nodes = 0
+        self._deadline = None
+        self._node_limit = None
+        self._cancel = None
+
+    # Position helpers
+
+    def position(self, own_values, opp_values):
+        """Convert two collections of board values into (own, opp) masks"""
+        return self.spec.mask_of(own_values), self.spec.mask_of(opp_values)
+
+    def legal_moves(self, own, opp):
+        """Cell indexes the side to move can mark"""
+        free = self.spec.reachable_mask & ~(own | opp)
+        return [k for k in self.cell_order if free >> k & 1]
+
+    def selector_for(self, value):
+        """A selector that can produce the given board value"""
+        bit = self.spec.value_bits[value]
+        for selector in self.spec.selectors:
+            if self.spec.selector_targets[selector] & bit:
+                return selector
+        return None
+
+    def evaluate(self, own, opp):
+        """Static score of a position for the side to move"""
+        if self.evaluator is not None:
+            return int(self.evaluator.evaluate(own, opp) * EVAL_SCALE)
+        score = 0
+        for win in self.spec.win_masks:
+            mine = own & win
+            theirs = opp & win
+            if mine and not theirs:
+                score += PATTERN_WEIGHTS[mine.bit_count()]
+            elif theirs and not mine:
+                score -= PATTERN_WEIGHTS[theirs.bit_count()]
+        return score
+
+    @property
+    def score_scale(self):
+        """Size of one static pattern point in this searcher's score units"""
+        return 1.0 if self.evaluator is None else EVAL_SCALE / EVAL_STATIC_EQUIVALENT
+
+    def cache_variant(self):
+        """Names the evaluation function in persistent cache keys"""
+        return "static" if self.evaluator is None else "learned:" + self.evaluator.fingerprint
+
+    # Search
+
+    def search(self, own, opp, depth=4, time_limit=None, node_limit=None):
+        """
+        Iterative-deepening search of a position
+
+        Args:
+            own: Mask of the side to move
+            opp: Mask of the opponent
+            depth: Maximum depth in plies
+            time_limit: Optional time budget in seconds
+            node_limit: Optional node budget
+
+        Returns:
+            SearchResult for the deepest iteration that completed
+        """
+        start = time.perf_counter()
+        if len(self.table) > self.max_table_entries:
+            self.table.clear()
+        self.nodes = 0
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._node_limit = node_limit
+
+        moves = self.legal_moves(own, opp)
+        if not moves:
+            return SearchResult(None, 0, 0, 0, [], 0.0)
+
+        if self.threat_solver is not None:
+            # Pre-pass: forcing sequences are much cheaper to search than all moves.
+            # Its nodes count against the search budget.
+            forced = self.threat_solver.solve(
+                own, opp,
+                time_limit=time_limit * THREAT_SHARE if time_limit is not None else None,
+                node_limit=int(node_limit * THREAT_SHARE) if node_limit is not None else None)
+            self.nodes += self.threat_solver.nodes
+            if forced is not None:
+                # Same scoring as the search: the winning move is played at ply len - 1
+                plies = len(forced.line)
+                self._deadline = None
+                self._node_limit = None
+                return SearchResult(forced.first_move, WIN_SCORE - (plies - 1), plies,
+                                    self.nodes, forced.line, time.perf_counter() - start)
+
+        best = SearchResult(self.spec.values[moves[0]], 0, 0, 0,
+                            [self.spec.values[moves[0]]], 0.0)
+        for d in range(1, depth + 1):
+            try:
+                score = self._negamax(own, opp, d, -WIN_SCORE - 1, WIN_SCORE + 1, 0)
+            except SearchAborted:
+                break
+            pv = self.principal_variation(own, opp, d)
+            best = SearchResult(pv[0] if pv else best.move, score, d, self.nodes, pv,
+                                time.perf_counter() - start)
+            if abs(score) >= MATE_SCORE:
+                break  # Forced result found, deeper search cannot change it
+
+        best.nodes = self.nodes
+        best.elapsed = time.perf_counter() - start
+        self._deadline = None
+        self._node_limit = None
+        return best
+
+    def principal_variation(self, own, opp, depth):
+        """Follow best moves stored in the table"""
+        pv = []
+        for _ in range(depth):
+            entry = self.table.get((own, opp))
+            if entry is None or entry[3] is None:
+                break
+            k = entry[3]
+            pv.append(self.spec.values[k])
+            own |= 1 << k
+            if self.spec.completes_win(own, k):
+                break
+            own, opp = opp, own
+        return pv
+
+    def _check_budget(self):
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            raise SearchAborted()
+        if self.nodes & 255 == 0:
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise SearchAborted()
+            if self._cancel is not None and self._cancel.is_set():
+                raise SearchAborted()
+
+    def _lookup(self, key, depth, ply):
+        entry = self.table.get(key)
+        if (entry is None or entry[0] < depth) and self.cache is not None \
+                and depth >= self.cache_min_depth:
+            # The persistent cache may hold a deeper result than this run found so far
+            stored = self.cache.get(self.spec, *key, variant=self.cache_variant())
+            if stored is not None and (entry is None or stored[0] > entry[0]):
+                entry = stored
+                self.table[key] = entry
+        if entry is None:
+            return None
+        # Stored win/loss scores count plies from the stored position
+        e_depth, score, flag, move = entry
+        if score > MATE_SCORE:
+            score -= ply
+        elif score < -MATE_SCORE:
+            score += ply
+        return e_depth, score, flag, move
+
+    def _store(self, key, depth, score, flag, move, ply):
+        if score > MATE_SCORE:
+            score += ply
+        elif score < -MATE_SCORE:
+            score -= ply
+        entry = (depth, score, flag, move)
+        self.table[key] = entry
+        if self.cache is not None and depth >= self.cache_min_depth:
+            self.cache.put(self.spec, key[0], key[1], entry, variant=self.cache_variant())
+
+    def _negamax(self, own, opp, depth, alpha, beta, ply):
+        self.nodes += 1
+        self._check_budget()
+
+        key = (own, opp)
+        entry = self._lookup(key, depth, ply)
+        tt_move = None
+        if entry is not None:
+            e_depth, e_score, e_flag, tt_move = entry
+            if e_depth >= depth:
+                if e_flag == EXACT:
+                    return e_score
+                if e_flag == LOWER and e_score >= beta:
+                    return e_score
+                if e_flag == UPPER and e_score <= alpha:
+                    return e_score
+
+        moves = self.legal_moves(own, opp)
+        if not moves:
+            return 0  # Board full: draw
+
+        spec = self.spec
+        # Immediate win ends the search at this node; the result holds at any depth
+        for k in moves:
+            if spec.completes_win(own | 1 << k, k):
+                self._store(key, spec.n_cells, WIN_SCORE - ply, EXACT, k, ply)
+                return WIN_SCORE - ply
+
+        if depth == 0:
+            return self.evaluate(own, opp)
+
+        # Order: stored best move, forced blocks, then the static order
+        blocks = [k for k in moves if spec.completes_win(opp | 1 << k, k)]
+        if len(blocks) > 1:
+            # Two open threats cannot both be blocked
+            score = -(WIN_SCORE - ply - 1)
+            self._store(key, spec.n_cells, score, EXACT, blocks[0], ply)
+            return score
+        if blocks:
+            moves = blocks
+        elif tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        alpha_orig = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = moves[0]
+        for k in moves:
+            score = -self._negamax(opp, own | 1 << k, depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score = score
+                best_move = k
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, depth, best_score, flag, best_move, ply)
+        return best_score
+
+
+# Search a sample position if run as a script
+if __name__ == "__main__":
+    searcher = Searcher()
+    own, opp = searcher.position({9, 16, 25}, {4, 10, 21})
+    for depth in (2, 4, 6):
+        searcher.table.clear()
+        result = searcher.search(own, opp, depth=depth)
+        print(f"Depth {depth}: {result} in {result.elapsed * 1000:.1f} ms")
@@ -0,0 +1,314 @@
+import atexit
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# board_spec attaches to published tables while it is being imported, so it
+# is only imported inside the functions here
+
+# Bump when the layout of the published tables changes
+TABLE_VERSION = 1
+
+
+def _block_name(namespace, version, name):
+    """Short, portable shared memory name (macOS allows 31 characters)"""
+    digest = hashlib.sha1(f"{namespace}|{version}|{name}".encode()).hexdigest()[:20]
+    return f"mg_{digest}"
+
+
+def _attach_block(name):
+    """Attach to an existing block without letting this process unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach is registered with the resource
+        # tracker, which then unlinks the block when the worker exits
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class TableRegistry:
+    def __init__(self, namespace="tables", version=TABLE_VERSION):
+        """
+        Precomputed tables published once into shared memory
+
+        The owning process builds each table as a flat NumPy array and copies
+        it into its own shared memory block. A manifest block, found by the
+        namespace and version alone, records the name, dtype and shape of
+        every table, so workers attach read-only zero-copy views by name.
+        The owner unlinks all blocks on close (or at interpreter exit).
+
+        Args:
+            namespace: Name shared by the owner and its workers
+            version: Table layout version; workers refuse other versions
+        """
+        self.namespace = namespace
+        self.version = str(version)
+        self.blocks = {}
+        self.manifest = {}
+        self._manifest_block = None
+        self._owner = False
+        self._closed = False
+
+    # Owner side
+
+    def publish(self, name, array):
+        """Copy an array into a new shared block and return a view of it"""
+        if self._closed:
+            raise RuntimeError("Registry is closed")
+        array = np.ascontiguousarray(array)
+        block_name = _block_name(self.namespace, self.version, name)
+        block = self._create_block(block_name, max(1, array.nbytes))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        view.flags.writeable = False
+
+        if not self._owner:
+            self._owner = True
+            atexit.register(self.close)
+        self.blocks[name] = block
+        self.manifest[name] = {"block": block_name, "dtype": array.dtype.str,
+                               "shape": list(array.shape)}
+        self._write_manifest()
+        return view
+
+    def _create_block(self, block_name, size):
+        try:
+            return shared_memory.SharedMemory(name=block_name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by an owner that did not shut down cleanly
+            stale = _attach_block(block_name)
+            stale.close()
+            stale.unlink()
+            return shared_memory.SharedMemory(name=block_name, create=True, size=size)
+
+    def _write_manifest(self):
+        data = json.dumps({"version": self.version, "tables": self.manifest}).encode()
+        name = _block_name(self.namespace, self.version, "__manifest__")
+        if self._manifest_block is not None:
+            self._manifest_block.close()
+            self._manifest_block.unlink()
+        # Length prefix, then the JSON document
+        block = self._create_block(name, len(data) + 8)
+        block.buf[:8] = len(data).to_bytes(8, "little")
+        block.buf[8:8 + len(data)] = data
+        self._manifest_block = block
+
+    # Worker side
+
+    @classmethod
+    def attach(cls, namespace="tables", version=TABLE_VERSION):
+        """
+        Attach to tables published by another process
+
+        Raises:
+            FileNotFoundError: Nothing is published under this namespace and version
+        """
+        registry = cls(namespace, version)
+        block = _attach_block(_block_name(namespace, registry.version, "__manifest__"))
+        size = int.from_bytes(bytes(block.buf[:8]), "little")
+        document = json.loads(bytes(block.buf[8:8 + size]).decode())
+        block.close()
+        if document["version"] != registry.version:
+            raise ValueError(f"Tables are version {document['version']}, "
+                             f"expected {registry.version}")
+        registry.manifest = document["tables"]
+        return registry
+
+    def __getitem__(self, name):
+        """Read-only NumPy view of a table"""
+        if name not in self.blocks:
+            entry = self.manifest[name]
+            self.blocks[name] = _attach_block(entry["block"])
+        entry = self.manifest[name]
+        view = np.ndarray(tuple(entry["shape"]), dtype=np.dtype(entry["dtype"]),
+                          buffer=self.blocks[name].buf)
+        view.flags.writeable = False
+        return view
+
+    def __contains__(self, name):
+        return name in self.manifest
+
+    def names(self):
+        return list(self.manifest)
+
+    def nbytes(self):
+        """Total size of the published tables"""
+        return sum(int(np.prod(e["shape"])) * np.dtype(e["dtype"]).itemsize
+                   for e in self.manifest.values())
+
+    # Cleanup
+
+    def close(self):
+        """Detach; the owner also unlinks every block"""
+        if self._closed:
+            return
+        self._closed = True
+        for block in self.blocks.values():
+            try:
+                block.close()
+                if self._owner:
+                    block.unlink()
+            except (BufferError, FileNotFoundError):
+                pass  # Views still alive, or already removed
+        if self._manifest_block is not None:
+            self._manifest_block.close()
+            self._manifest_block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def publish_spec_tables(registry, spec=None):
+    """
+    Publish a BoardSpec's tables as flat arrays
+
+    Tables:
+        spec_shape: rows, cols and win_length
+        spec_fingerprint: the spec fingerprint as bytes
+        selectors: the selector numbers
+        board_values: (n_cells,) board value per cell, -1 for holes
+        value_index: (max value + 1,) cell of each board value, -1 if absent
+        win_pattern_cells: (patterns, win_length) cells of each win pattern
+        win_mask_words: (patterns, n_words) uint64 bitboard of each pattern
+        cell_pattern_offsets, cell_pattern_ids: CSR index cell -> patterns
+        selector_target_words: (selectors, n_words) cells each selector reaches
+        products: (pairs, 3) selector, multiplicand, product
+    """
+    import board_spec
+
+    spec = spec or board_spec.DEFAULT_SPEC
+    registry.publish("spec_shape", np.array([spec.rows, spec.cols, spec.win_length],
+                                            dtype=np.int32))
+    registry.publish("spec_fingerprint", np.frombuffer(spec.fingerprint.encode(), dtype=np.uint8))
+    registry.publish("selectors", np.array(spec.selectors, dtype=np.int32))
+    values = np.array([-1 if v is None else v for v in spec.values], dtype=np.int32)
+    registry.publish("board_values", values)
+
+    value_index = np.full(values.max() + 1, -1, dtype=np.int32)
+    for value, index in spec.value_index.items():
+        value_index[value] = index
+    registry.publish("value_index", value_index)
+
+    registry.publish("win_pattern_cells",
+                     np.array(spec.win_pattern_cells, dtype=np.int32).reshape(-1, spec.win_length))
+    registry.publish("win_mask_words",
+                     np.array([spec.to_words(m) for m in spec.win_masks],
+                              dtype=np.uint64).reshape(-1, spec.n_words))
+
+    offsets = np.zeros(spec.n_cells + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum([len(p) for p in spec.cell_patterns])
+    registry.publish("cell_pattern_offsets", offsets)
+    registry.publish("cell_pattern_ids",
+                     np.array([p for ps in spec.cell_patterns for p in ps], dtype=np.int32))
+
+    registry.publish("selector_target_words",
+                     np.array([spec.to_words(spec.selector_targets[s]) for s in spec.selectors],
+                              dtype=np.uint64).reshape(-1, spec.n_words))
+    registry.publish("products",
+                     np.array([(s, m, p) for s in spec.selectors for m, p in spec.products[s]],
+                              dtype=np.int32).reshape(-1, 3))
+    return registry
+
+
+def publish_evaluator(registry, evaluator):
+    """Publish an Evaluator's weights and pattern incidence matrix"""
+    registry.publish("evaluator_weights", evaluator.weights)
+    registry.publish("evaluator_pattern_matrix", evaluator.pattern_matrix)
+    return registry
+
+
+def evaluator_from_tables(registry, spec=None):
+    """Evaluator whose weights and pattern matrix are views of the shared tables"""
+    from evaluator import Evaluator
+
+    return Evaluator(spec or attach_spec(registry), registry["evaluator_weights"],
+                     pattern_matrix=registry["evaluator_pattern_matrix"])
+
+
+def attach_spec(registry):
+    """
+    BoardSpec described by attached tables (a TableRegistry or its namespace)
+
+    The spec is registered with board_spec, so get_spec and every module
+    asking for the same rules share it instead of building their own. It is
+    a per-process copy of the tables (see BoardSpec.from_tables), not a view.
+    """
+    import board_spec
+
+    if not isinstance(registry, TableRegistry):
+        registry = TableRegistry.attach(registry)
+    return board_spec.use_tables(registry)
+
+
+@contextmanager
+def shared_spec_tables(spec=None, evaluator=None):
+    """
+    Publish a spec's tables (and optionally an evaluator) for worker processes
+
+    While the block runs, board_spec.TABLES_ENV names the tables, so
+    spawned workers take the default spec from them when they import
+    board_spec. Pool initializers pass the yielded namespace to attach_spec.
+
+    Yields:
+        Namespace of the tables
+    """
+    import board_spec
+
+    spec = spec or board_spec.DEFAULT_SPEC
+    namespace = f"spec{spec.fingerprint}_{os.getpid()}"
+    previous = os.environ.get(board_spec.TABLES_ENV)
+    with TableRegistry(namespace) as registry:
+        publish_spec_tables(registry, spec)
+        if evaluator is not None:
+            publish_evaluator(registry, evaluator)
+        os.environ[board_spec.TABLES_ENV] = namespace
+        try:
+            yield namespace
+        finally:
+            if previous is None:
+                os.environ.pop(board_spec.TABLES_ENV, None)
+            else:
+                os.environ[board_spec.TABLES_ENV] = previous
+
+
+# Share tables with a process pool if run as a script
+if __name__ == "__main__":
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    from evaluator import Evaluator
+
+    _tables = None
+
+    def init_worker(namespace):
+        global _tables
+        _tables = TableRegistry.attach(namespace)
+
+    def worker_summary(_):
+        evaluator = evaluator_from_tables(_tables)
+        patterns = _tables["win_pattern_cells"]
+        return (os.getpid(), len(patterns), evaluator.evaluate(0, 0),
+                evaluator.weights.flags.owndata)
+
+    with shared_spec_tables(evaluator=Evaluator()) as namespace:
+        registry = TableRegistry.attach(namespace)
+        print(f"Published {len(registry.names())} tables, {registry.nbytes()} bytes")
+
+        with ProcessPoolExecutor(max_workers=2, initializer=init_worker,
+                                 initargs=(namespace,)) as pool:
+            for pid, n_patterns, value, owns in pool.map(worker_summary, range(4)):
+                print(f"Worker {pid}: {n_patterns} win patterns, empty board value {value:.3f}, "
+                      f"weights copied: {owns}")
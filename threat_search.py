@@ -0,0 +1,204 @@
+import time
+
+from board_spec import DEFAULT_SPEC
+from move_validation import MoveValidator
+from search import SearchAborted
+
+
+class ForcedWin:
+    def __init__(self, line, selectors, nodes, elapsed):
+        """
+        A forced win found by the threat-space solver
+
+        Args:
+            line: Board values played in order, attacker first; every
+                  defender move in the line is a forced block
+            selectors: Selector the attacker uses for each of its moves
+            nodes: Number of positions visited
+            elapsed: Solve time in seconds
+        """
+        self.line = line
+        self.selectors = selectors
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def first_move(self):
+        return self.line[0]
+
+    @property
+    def depth(self):
+        """Number of attacker moves up to and including the winning one"""
+        return (len(self.line) + 1) // 2
+
+    def __repr__(self):
+        return f"ForcedWin(depth={self.depth}, line={self.line}, nodes={self.nodes})"
+
+
+class ThreatSolver:
+    def __init__(self, spec=None, validator=None):
+        """
+        Find forced wins by searching only forcing sequences
+
+        The attacker only plays moves that leave a pattern one mark short of
+        a win (a threat, as found by GameLogic.get_potential_win_paths), so
+        the defender's reply is forced: block, or lose. Two threats at once
+        cannot both be blocked. Every attacker move and every block has to
+        be producible through the selector rules in MoveValidator.
+
+        Args:
+            spec: BoardSpec of the game (defaults to the standard game)
+            validator: Optional MoveValidator for the selector rules
+        """
+        self.spec = spec or DEFAULT_SPEC
+        self.validator = validator or MoveValidator(spec=self.spec)
+
+        # Cells the selector rules can produce, and a selector for each
+        self.reachable = 0
+        self.cell_selector = {}
+        for selector in self.spec.selectors:
+            for _, product in self.validator.find_products_on_board(selector):
+                index = self.spec.value_index[product]
+                self.reachable |= 1 << index
+                self.cell_selector.setdefault(index, selector)
+
+        self.table = {}
+        self.nodes = 0
+        self._deadline = None
+        self._node_limit = None
+
+    def threats(self, own, opp):
+        """Mask of empty reachable cells that would complete one of own's patterns"""
+        n = self.spec.win_length
+        empty = self.spec.full_mask & ~(own | opp)
+        threats = 0
+        for win in self.spec.win_masks:
+            if not opp & win and (own & win).bit_count() == n - 1:
+                threats |= win & empty
+        return threats & self.reachable
+
+    def threat_moves(self, own, opp):
+        """Empty reachable cells that leave own with at least one new threat"""
+        n = self.spec.win_length
+        empty = self.spec.full_mask & ~(own | opp)
+        moves = 0
+        for win in self.spec.win_masks:
+            if not opp & win and (own & win).bit_count() == n - 2:
+                moves |= win & empty
+        return moves & self.reachable
+
+    def solve(self, own, opp, max_depth=8, time_limit=None, node_limit=None):
+        """
+        Look for a forced win for the side to move
+
+        Args:
+            own: Mask of the attacker (side to move)
+            opp: Mask of the defender
+            max_depth: Maximum number of attacker moves
+            time_limit: Optional time budget in seconds
+            node_limit: Optional node budget; unlike the time budget it
+                        gives the same answer on every machine
+
+        Returns:
+            ForcedWin, or None if no forcing win exists within max_depth
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._node_limit = node_limit
+        if len(self.table) > 1000000:
+            self.table.clear()
+
+        line = None
+        for depth in range(1, max_depth + 1):
+            try:
+                line = self._attack(own, opp, depth)
+            except SearchAborted:
+                break
+            if line is not None:
+                break
+        self._deadline = None
+        self._node_limit = None
+        if line is None:
+            return None
+
+        selectors = [self.cell_selector[self.spec.value_index[value]] for value in line[::2]]
+        return ForcedWin(line, selectors, self.nodes, time.perf_counter() - start)
+
+    def solve_marks(self, attacker_marks, defender_marks, max_depth=8, time_limit=None):
+        """solve() for sets of board values"""
+        return self.solve(self.spec.mask_of(attacker_marks), self.spec.mask_of(defender_marks),
+                          max_depth, time_limit)
+
+    def _attack(self, own, opp, depth):
+        """Forcing line (list of values) winning for own within depth moves, or None"""
+        self.nodes += 1
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            raise SearchAborted()
+        if self._deadline is not None and self.nodes & 255 == 0 \
+                and time.perf_counter() >= self._deadline:
+            raise SearchAborted()
+
+        values = self.spec.values
+        wins = self.threats(own, opp)
+        if wins:
+            return [values[(wins & -wins).bit_length() - 1]]
+        if depth <= 1:
+            return None
+
+        key = (own, opp)
+        if self.table.get(key, 0) >= depth:
+            return None  # Already failed at least this deep
+
+        candidates = self.threat_moves(own, opp)
+        defender_threats = self.threats(opp, own)
+        if defender_threats:
+            if defender_threats & (defender_threats - 1):
+                self.table[key] = depth
+                return None  # Two defender threats: no time to attack
+            # The attacker has to block, which only helps if it is also a threat
+            candidates &= defender_threats
+
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            attacker = own | low
+            threats = self.threats(attacker, opp)
+            if not threats:
+                continue
+            if threats & (threats - 1):
+                # Double threat: whichever cell is blocked, the other one wins
+                block = threats & -threats
+                win = threats ^ block
+                win &= -win
+                return [values[low.bit_length() - 1], values[block.bit_length() - 1],
+                        values[win.bit_length() - 1]]
+
+            # Single threat: the defender must block it (threat cells are reachable)
+            rest = self._attack(attacker, opp | threats, depth - 1)
+            if rest is not None:
+                return [values[low.bit_length() - 1], values[threats.bit_length() - 1]] + rest
+
+        self.table[key] = depth
+        return None
+
+
+# Compare with full-width search if run as a script
+if __name__ == "__main__":
+    from search import Searcher
+
+    solver = ThreatSolver()
+    searcher = Searcher()
+
+    attacker = {6, 10, 25, 40, 49, 63, 81}
+    defender = {1, 2, 8, 15, 45, 64, 72}
+    own, opp = solver.spec.mask_of(attacker), solver.spec.mask_of(defender)
+
+    result = solver.solve(own, opp, max_depth=8)
+    print(f"Threat-space solver: {result} in {result.elapsed * 1000:.2f} ms" if result
+          else "Threat-space solver: no forced win")
+
+    depth = 2 * result.depth - 1 if result else 5
+    full = searcher.search(own, opp, depth=depth)
+    print(f"Full-width search to depth {depth}: move {full.move}, score {full.score}, "
+          f"{full.nodes} nodes in {full.elapsed * 1000:.1f} ms")